@@ -0,0 +1,29 @@
+"""Add max_pages to search preferences
+
+Revision ID: 3b7e21c4d9a0
+Revises: 15cfa1a8cdc3
+Create Date: 2026-10-17 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7e21c4d9a0'
+down_revision: Union[str, None] = '15cfa1a8cdc3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('search_preferences', sa.Column('max_pages', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('search_preferences') as batch_op:
+        batch_op.drop_column('max_pages')
@@ -0,0 +1,247 @@
+"""Split listings into a shared catalog and per-preference state
+
+Revision ID: a41f6d2e9b57
+Revises: c52a9e7f3b18
+Create Date: 2026-10-17 11:26:08.114902
+
+"""
+from typing import Any, Dict, Sequence, Tuple, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41f6d2e9b57'
+down_revision: Union[str, None] = 'c52a9e7f3b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 1000
+
+legacy_listings = sa.table(
+    'listings_legacy',
+    sa.column('user_id', sa.String),
+    sa.column('preference_id', sa.String),
+    sa.column('listing_id', sa.String),
+    sa.column('raw_payload', sa.JSON),
+    sa.column('price', sa.String),
+    sa.column('price_hash', sa.String),
+    sa.column('price_drop_notified', sa.Boolean),
+    sa.column('last_notification_type', sa.String),
+    sa.column('last_notified_at', sa.DateTime),
+    sa.column('first_seen_at', sa.DateTime),
+    sa.column('last_seen_at', sa.DateTime),
+)
+
+catalog = sa.table(
+    'listings',
+    sa.column('listing_id', sa.String),
+    sa.column('title', sa.Text),
+    sa.column('price', sa.String),
+    sa.column('location', sa.Text),
+    sa.column('details', sa.Text),
+    sa.column('link', sa.Text),
+    sa.column('price_drop_text', sa.String),
+    sa.column('rooms', sa.Float),
+    sa.column('floor', sa.Integer),
+    sa.column('sqm', sa.Integer),
+    sa.column('first_seen_at', sa.DateTime),
+    sa.column('updated_at', sa.DateTime),
+)
+
+states = sa.table(
+    'listing_states',
+    sa.column('preference_id', sa.String),
+    sa.column('listing_id', sa.String),
+    sa.column('price', sa.String),
+    sa.column('previous_price', sa.String),
+    sa.column('price_hash', sa.String),
+    sa.column('price_drop_notified', sa.Boolean),
+    sa.column('last_notification_type', sa.String),
+    sa.column('last_notified_at', sa.DateTime),
+    sa.column('first_seen_at', sa.DateTime),
+    sa.column('last_seen_at', sa.DateTime),
+)
+
+preferences = sa.table(
+    'search_preferences',
+    sa.column('id', sa.String),
+    sa.column('user_id', sa.String),
+)
+
+
+def _number(value: Any, kind: type) -> Any:
+    if value is None:
+        return None
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _insert_batches(bind, table, rows) -> None:
+    rows = list(rows)
+    for start in range(0, len(rows), BATCH_SIZE):
+        bind.execute(table.insert(), rows[start:start + BATCH_SIZE])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('ix_listings_user_id', table_name='listings')
+    op.drop_index('ix_listings_preference_id', table_name='listings')
+    op.drop_index('ix_listing_user_listing', table_name='listings')
+    op.drop_index('ix_listing_preference_listing', table_name='listings')
+    op.rename_table('listings', 'listings_legacy')
+
+    op.create_table('listings',
+    sa.Column('listing_id', sa.String(length=64), nullable=False),
+    sa.Column('title', sa.Text(), nullable=False),
+    sa.Column('price', sa.String(length=64), nullable=True),
+    sa.Column('location', sa.Text(), nullable=True),
+    sa.Column('details', sa.Text(), nullable=True),
+    sa.Column('link', sa.Text(), nullable=True),
+    sa.Column('price_drop_text', sa.String(length=255), nullable=True),
+    sa.Column('rooms', sa.Float(), nullable=True),
+    sa.Column('floor', sa.Integer(), nullable=True),
+    sa.Column('sqm', sa.Integer(), nullable=True),
+    sa.Column('first_seen_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('listing_id')
+    )
+    op.create_table('listing_states',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('preference_id', sa.String(length=64), nullable=False),
+    sa.Column('listing_id', sa.String(length=64), nullable=False),
+    sa.Column('price', sa.String(length=64), nullable=True),
+    sa.Column('previous_price', sa.String(length=64), nullable=True),
+    sa.Column('price_hash', sa.String(length=64), nullable=True),
+    sa.Column('price_drop_notified', sa.Boolean(), nullable=False),
+    sa.Column('last_notification_type', sa.String(length=32), nullable=True),
+    sa.Column('last_notified_at', sa.DateTime(), nullable=True),
+    sa.Column('first_seen_at', sa.DateTime(), nullable=False),
+    sa.Column('last_seen_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['listing_id'], ['listings.listing_id'], ),
+    sa.ForeignKeyConstraint(['preference_id'], ['search_preferences.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_listing_state_preference_listing', 'listing_states', ['preference_id', 'listing_id'], unique=True)
+    op.create_index(op.f('ix_listing_states_listing_id'), 'listing_states', ['listing_id'], unique=False)
+
+    # Oldest first, so the newest payload of a listing ends up in the catalog
+    bind = op.get_bind()
+    catalog_rows: Dict[str, Dict[str, Any]] = {}
+    state_rows: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for row in bind.execute(sa.select(legacy_listings).order_by(legacy_listings.c.last_seen_at)).mappings():
+        payload = row['raw_payload'] or {}
+        existing = catalog_rows.get(row['listing_id'])
+        catalog_rows[row['listing_id']] = {
+            'listing_id': row['listing_id'],
+            'title': payload.get('title') or '',
+            'price': payload.get('price', row['price']),
+            'location': payload.get('location'),
+            'details': payload.get('details'),
+            'link': payload.get('link'),
+            'price_drop_text': payload.get('price_drop_text') if payload.get('price_dropped') else None,
+            'rooms': _number(payload.get('rooms'), float),
+            'floor': _number(payload.get('floor'), int),
+            'sqm': _number(payload.get('sqm'), int),
+            'first_seen_at': min(existing['first_seen_at'], row['first_seen_at']) if existing else row['first_seen_at'],
+            'updated_at': row['last_seen_at'],
+        }
+        state_rows[(row['preference_id'], row['listing_id'])] = {
+            'preference_id': row['preference_id'],
+            'listing_id': row['listing_id'],
+            'price': row['price'],
+            'previous_price': payload.get('old_price'),
+            'price_hash': row['price_hash'],
+            'price_drop_notified': row['price_drop_notified'],
+            'last_notification_type': row['last_notification_type'],
+            'last_notified_at': row['last_notified_at'],
+            'first_seen_at': row['first_seen_at'],
+            'last_seen_at': row['last_seen_at'],
+        }
+
+    _insert_batches(bind, catalog, catalog_rows.values())
+    _insert_batches(bind, states, state_rows.values())
+    op.drop_table('listings_legacy')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_table('listings_legacy',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.String(length=64), nullable=False),
+    sa.Column('preference_id', sa.String(length=64), nullable=False),
+    sa.Column('listing_id', sa.String(length=64), nullable=False),
+    sa.Column('raw_payload', sa.JSON(), nullable=False),
+    sa.Column('price', sa.String(length=64), nullable=True),
+    sa.Column('price_hash', sa.String(length=64), nullable=True),
+    sa.Column('price_drop_notified', sa.Boolean(), nullable=False),
+    sa.Column('last_notification_type', sa.String(length=32), nullable=True),
+    sa.Column('last_notified_at', sa.DateTime(), nullable=True),
+    sa.Column('first_seen_at', sa.DateTime(), nullable=False),
+    sa.Column('last_seen_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['preference_id'], ['search_preferences.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # The old table is unique per (user, listing); keep the most recently seen state
+    bind = op.get_bind()
+    query = (
+        sa.select(
+            states,
+            preferences.c.user_id,
+            catalog.c.title,
+            catalog.c.location,
+            catalog.c.details,
+            catalog.c.link,
+            catalog.c.price_drop_text,
+        )
+        .join(preferences, states.c.preference_id == preferences.c.id)
+        .join(catalog, states.c.listing_id == catalog.c.listing_id)
+        .order_by(states.c.last_seen_at)
+    )
+    legacy_rows: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for row in bind.execute(query).mappings():
+        payload = {
+            'id': row['listing_id'],
+            'title': row['title'],
+            'price': row['price'],
+            'location': row['location'],
+            'details': row['details'],
+            'link': row['link'],
+            'price_dropped': row['price_drop_text'] is not None,
+        }
+        if row['price_drop_text'] is not None:
+            payload['price_drop_text'] = row['price_drop_text']
+        if row['last_notification_type']:
+            payload['notification_type'] = row['last_notification_type']
+        if row['previous_price']:
+            payload['old_price'] = row['previous_price']
+        legacy_rows[(row['user_id'], row['listing_id'])] = {
+            'user_id': row['user_id'],
+            'preference_id': row['preference_id'],
+            'listing_id': row['listing_id'],
+            'raw_payload': payload,
+            'price': row['price'],
+            'price_hash': row['price_hash'],
+            'price_drop_notified': row['price_drop_notified'],
+            'last_notification_type': row['last_notification_type'],
+            'last_notified_at': row['last_notified_at'],
+            'first_seen_at': row['first_seen_at'],
+            'last_seen_at': row['last_seen_at'],
+        }
+    _insert_batches(bind, legacy_listings, legacy_rows.values())
+
+    op.drop_index(op.f('ix_listing_states_listing_id'), table_name='listing_states')
+    op.drop_index('ix_listing_state_preference_listing', table_name='listing_states')
+    op.drop_table('listing_states')
+    op.drop_table('listings')
+    op.rename_table('listings_legacy', 'listings')
+    op.create_index('ix_listing_preference_listing', 'listings', ['preference_id', 'listing_id'], unique=False)
+    op.create_index('ix_listing_user_listing', 'listings', ['user_id', 'listing_id'], unique=True)
+    op.create_index(op.f('ix_listings_preference_id'), 'listings', ['preference_id'], unique=False)
+    op.create_index(op.f('ix_listings_user_id'), 'listings', ['user_id'], unique=False)
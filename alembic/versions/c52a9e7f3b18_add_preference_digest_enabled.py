@@ -0,0 +1,29 @@
+"""Add digest_enabled to search preferences
+
+Revision ID: c52a9e7f3b18
+Revises: 8d4f0a2b6c11
+Create Date: 2026-10-17 10:41:55.730914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c52a9e7f3b18'
+down_revision: Union[str, None] = '8d4f0a2b6c11'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('search_preferences', sa.Column('digest_enabled', sa.Boolean(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('search_preferences') as batch_op:
+        batch_op.drop_column('digest_enabled')
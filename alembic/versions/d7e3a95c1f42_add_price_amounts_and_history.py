@@ -0,0 +1,102 @@
+"""Add integer price amounts and listing price history
+
+Revision ID: d7e3a95c1f42
+Revises: a41f6d2e9b57
+Create Date: 2026-10-17 12:08:41.602337
+
+"""
+import re
+from typing import Any, Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7e3a95c1f42'
+down_revision: Union[str, None] = 'a41f6d2e9b57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 1000
+PRICE_DIGITS = re.compile(r'\d[\d,]*')
+
+catalog = sa.table(
+    'listings',
+    sa.column('listing_id', sa.String),
+    sa.column('price', sa.String),
+    sa.column('price_amount', sa.Integer),
+    sa.column('updated_at', sa.DateTime),
+)
+
+states = sa.table(
+    'listing_states',
+    sa.column('id', sa.Integer),
+    sa.column('price', sa.String),
+    sa.column('price_amount', sa.Integer),
+)
+
+history = sa.table(
+    'listing_price_history',
+    sa.column('listing_id', sa.String),
+    sa.column('price_amount', sa.Integer),
+    sa.column('price', sa.String),
+    sa.column('observed_at', sa.DateTime),
+)
+
+
+def _amount(price: Optional[str]) -> Optional[int]:
+    if not price:
+        return None
+    match = PRICE_DIGITS.search(price)
+    return int(match.group().replace(',', '')) if match else None
+
+
+def _backfill(bind, table, key: Any) -> None:
+    rows = [
+        {'key': row[0], 'amount': _amount(row[1])}
+        for row in bind.execute(sa.select(key, table.c.price))
+    ]
+    rows = [row for row in rows if row['amount'] is not None]
+    stmt = table.update().where(key == sa.bindparam('key')).values(price_amount=sa.bindparam('amount'))
+    for start in range(0, len(rows), BATCH_SIZE):
+        bind.execute(stmt, rows[start:start + BATCH_SIZE])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('listings', sa.Column('price_amount', sa.Integer(), nullable=True))
+    op.add_column('listing_states', sa.Column('price_amount', sa.Integer(), nullable=True))
+    op.create_table('listing_price_history',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('listing_id', sa.String(length=64), nullable=False),
+    sa.Column('price_amount', sa.Integer(), nullable=False),
+    sa.Column('price', sa.String(length=64), nullable=True),
+    sa.Column('observed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['listing_id'], ['listings.listing_id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_price_history_listing_observed', 'listing_price_history', ['listing_id', 'observed_at'], unique=False)
+
+    bind = op.get_bind()
+    _backfill(bind, catalog, catalog.c.listing_id)
+    _backfill(bind, states, states.c.id)
+    # Seed each timeline with the price currently known for the listing
+    bind.execute(
+        history.insert().from_select(
+            ['listing_id', 'price_amount', 'price', 'observed_at'],
+            sa.select(catalog.c.listing_id, catalog.c.price_amount, catalog.c.price, catalog.c.updated_at)
+            .where(catalog.c.price_amount.is_not(None)),
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_price_history_listing_observed', table_name='listing_price_history')
+    op.drop_table('listing_price_history')
+    with op.batch_alter_table('listing_states') as batch_op:
+        batch_op.drop_column('price_amount')
+    with op.batch_alter_table('listings') as batch_op:
+        batch_op.drop_column('price_amount')
@@ -1,18 +1,32 @@
 from __future__ import annotations
 
+import hashlib
 import logging
-from typing import Any, Dict
+import secrets
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
-from fastapi import APIRouter, HTTPException, Request, status
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
 from sqlalchemy import func, select
+from starlette.concurrency import run_in_threadpool
 
 from ..config import get_settings
 from ..db import session_scope
-from ..models import Listing, SearchPreference, User
-from ..schemas import AuthRequest, RegisterUserRequest, RegisterUserResponse, UserStatusResponse
-from ..services.monitor import MonitorManager
+from ..models import Listing, ListingPriceHistory, ListingState, SearchPreference, User
+from ..schemas import (
+    AuthRequest,
+    PriceDrop,
+    PriceDropsResponse,
+    PriceHistoryResponse,
+    PricePoint,
+    RegisterUserRequest,
+    RegisterUserResponse,
+    UserStatusResponse,
+)
 from ..services.telegram import TelegramService, escape_markdown
 
+if TYPE_CHECKING:
+    from ..services.monitor import MonitorManager
+
 
 logger = logging.getLogger(__name__)
 
@@ -32,10 +46,12 @@ def authenticate(payload: AuthRequest) -> dict[str, bool]:
     return {"authenticated": False}
 
 
-def _get_services(request: Request) -> tuple[TelegramService, MonitorManager]:
+def _get_services(request: Request) -> tuple[TelegramService, Optional[MonitorManager]]:
+    """The app's Telegram service and monitor manager (``None`` in the ``api`` service role)."""
+
     try:
         telegram_service: TelegramService = request.app.state.telegram_service
-        monitor_manager: MonitorManager = request.app.state.monitor_manager
+        monitor_manager: Optional[MonitorManager] = request.app.state.monitor_manager
     except AttributeError as exc:  # pragma: no cover - defensive
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Service not initialized") from exc
     return telegram_service, monitor_manager
@@ -76,31 +92,43 @@ def register_user(payload: RegisterUserRequest, request: Request) -> RegisterUse
                 preference.label = payload.label
             preference.active = True
 
+        if payload.max_pages is not None:
+            preference.max_pages = min(payload.max_pages, get_settings().max_pages_per_search)
+        if payload.digest_enabled is not None:
+            preference.digest_enabled = payload.digest_enabled
+
         session.flush()
 
         deep_link = telegram_service.generate_deep_link(user)
-        qr_code = telegram_service.generate_qr_code(deep_link)
         preference_id = preference.id
         user_id = user.id
         chat_id = user.telegram_chat_id
         label = preference.label or "Yad2 search"
         source_url = preference.source_url
 
+    # Rendered after the session is released; cached per deep link
+    qr_code = telegram_service.generate_qr_code(deep_link) if deep_link else None
+
     # Only start monitoring if user has already connected their Telegram
     if chat_id:
-        monitor_manager.start_monitor(preference_id)
+        # Without a local monitor manager, the monitoring process picks the preference up on its next sync
+        if monitor_manager is not None:
+            monitor_manager.start_monitor(preference_id)
         try:
             message = (
-                "\ud83d\udd0d Monitoring updated for *{label}*\n"
+                "\U0001f50d Monitoring updated for *{label}*\n"
                 "We'll notify you about new listings and price changes.\n"
-                "\ud83d\udd17 [View search]({url})"
+                "\U0001f517 [View search]({url})"
             ).format(label=escape_markdown(label), url=source_url)
-            telegram_service.send_message(chat_id, message)
+            # Queued for the delivery sender, so the request never waits on Telegram
+            telegram_service.notify_listing_updates(chat_id, [message])
         except Exception:  # noqa: BLE001
-            logger.exception("Failed to send registration confirmation to Telegram chat %s", chat_id)
+            logger.exception("Failed to queue registration confirmation for Telegram chat %s", chat_id)
 
     if chat_id:
         response_message = "Search preference updated. Monitoring is active."
+    elif deep_link is None:
+        response_message = "Registration saved, but the Telegram link is not available yet. Please try again shortly."
     else:
         response_message = "Registration completed. Scan the QR code or click the Telegram link to activate monitoring."
     
@@ -112,6 +140,28 @@ def register_user(payload: RegisterUserRequest, request: Request) -> RegisterUse
         message=response_message,
     )
 
+
+@router.post("/telegram/webhook", include_in_schema=False)
+async def telegram_webhook(request: Request) -> dict[str, bool]:
+    """Receive Telegram updates pushed by the Bot API in webhook mode."""
+
+    telegram_service: TelegramService | None = getattr(request.app.state, "telegram_service", None)
+    if telegram_service is None or telegram_service.webhook_secret is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Webhook not enabled")
+
+    received = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if not secrets.compare_digest(received, telegram_service.webhook_secret):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid secret token")
+
+    from telegram import Update
+
+    update = Update.de_json(await request.json(), telegram_service.bot)
+    if update is not None:
+        # DB writes and on_user_registered are blocking; keep them off the event loop
+        await run_in_threadpool(telegram_service.handle_update, update)
+    return {"ok": True}
+
+
 @router.get("/debug/auth")
 def debug_auth():
     """Debug endpoint to check auth credentials."""
@@ -123,7 +173,34 @@ def debug_auth():
         "has_credentials": len(credentials) > 0,
     }
 
-    
+
+@router.get("/users/{user_id}/qr.png", response_class=Response)
+def get_user_qr_code(user_id: str, request: Request) -> Response:
+    """The user's Telegram deep link as a PNG QR code, cacheable by the client."""
+
+    telegram_service, _ = _get_services(request)
+    with session_scope() as session:
+        user = session.get(User, user_id)
+        if user is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        deep_link = telegram_service.generate_deep_link(user)
+    if deep_link is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Telegram bot username not resolved yet",
+            headers={"Retry-After": "30"},
+        )
+
+    # The link embeds the user's start token, so only the requesting client may cache it
+    headers = {
+        "Cache-Control": "private, max-age=86400",
+        "ETag": '"{}"'.format(hashlib.sha256(deep_link.encode()).hexdigest()[:32]),
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=telegram_service.generate_qr_png(deep_link), media_type="image/png", headers=headers)
+
+
 @router.get("/users/{user_id}/status", response_model=UserStatusResponse)
 def get_user_status(user_id: str) -> UserStatusResponse:
     with session_scope() as session:
@@ -140,15 +217,20 @@ def get_user_status(user_id: str) -> UserStatusResponse:
                     "source_url": pref.source_url,
                     "active": pref.active,
                     "check_interval_minutes": pref.check_interval_minutes,
+                    "max_pages": pref.max_pages,
+                    "digest_enabled": pref.digest_enabled,
                     "created_at": pref.created_at,
                 }
             )
 
         pending_notifications = session.execute(
-            select(func.count()).select_from(Listing).where(
-                Listing.user_id == user.id,
-                Listing.last_notified_at.is_(None),
-                Listing.last_notification_type.is_not(None),
+            select(func.count())
+            .select_from(ListingState)
+            .join(SearchPreference, ListingState.preference_id == SearchPreference.id)
+            .where(
+                SearchPreference.user_id == user.id,
+                ListingState.last_notified_at.is_(None),
+                ListingState.last_notification_type.is_not(None),
             )
         ).scalar_one()
 
@@ -159,3 +241,70 @@ def get_user_status(user_id: str) -> UserStatusResponse:
         pending_notifications=pending_notifications or 0,
     )
 
+
+@router.get("/listings/{listing_id}/prices", response_model=PriceHistoryResponse)
+def get_listing_prices(listing_id: str) -> PriceHistoryResponse:
+    """Price timeline of a listing, oldest observation first."""
+
+    with session_scope() as session:
+        listing = session.get(Listing, listing_id)
+        if listing is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Listing not found")
+
+        rows = session.execute(
+            select(ListingPriceHistory.price_amount, ListingPriceHistory.price, ListingPriceHistory.observed_at)
+            .where(ListingPriceHistory.listing_id == listing_id)
+            .order_by(ListingPriceHistory.observed_at)
+        ).all()
+
+        return PriceHistoryResponse(
+            listing_id=listing.listing_id,
+            title=listing.title,
+            link=listing.link,
+            current_price_amount=listing.price_amount,
+            history=[
+                PricePoint(price_amount=row.price_amount, price=row.price, observed_at=row.observed_at)
+                for row in rows
+            ],
+        )
+
+
+@router.get("/preferences/{preference_id}/price-drops", response_model=PriceDropsResponse)
+def get_preference_price_drops(
+    preference_id: str,
+    limit: int = Query(default=20, ge=1, le=200),
+) -> PriceDropsResponse:
+    """Listings of a preference ranked by how far they fell from their highest recorded price."""
+
+    peak = func.max(ListingPriceHistory.price_amount)
+    drop = (peak - Listing.price_amount).label("drop_amount")
+    with session_scope() as session:
+        if session.get(SearchPreference, preference_id) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Preference not found")
+
+        rows = session.execute(
+            select(Listing.listing_id, Listing.title, Listing.link, peak.label("peak"), Listing.price_amount, drop)
+            .select_from(ListingState)
+            .join(Listing, ListingState.listing_id == Listing.listing_id)
+            .join(ListingPriceHistory, ListingPriceHistory.listing_id == ListingState.listing_id)
+            .where(ListingState.preference_id == preference_id, Listing.price_amount.is_not(None))
+            .group_by(Listing.listing_id)
+            .having(drop > 0)
+            .order_by(drop.desc())
+            .limit(limit)
+        ).all()
+
+    return PriceDropsResponse(
+        preference_id=preference_id,
+        drops=[
+            PriceDrop(
+                listing_id=row.listing_id,
+                title=row.title,
+                link=row.link,
+                peak_price_amount=row.peak,
+                current_price_amount=row.price_amount,
+                drop_amount=row.drop_amount,
+            )
+            for row in rows
+        ],
+    )
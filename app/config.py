@@ -16,10 +16,43 @@ class Settings(BaseSettings):
     # Database
     data_dir: Path = Path("data")
     sqlite_db_filename: str = "yad2_monitor.db"
+    # "tuned" applies the pragmas below on every connection; "default" keeps SQLite defaults
+    sqlite_storage_profile: str = "tuned"
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size_bytes: int = 256 * 1024 * 1024
+    sqlite_cache_size_kib: int = 64 * 1024
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout_seconds: int = 30
+    # Retention: states not seen for retention_days are deleted; 0 (default) disables the job
+    retention_days: int = 0
+    retention_batch_size: int = 500
+    retention_interval_seconds: int = 6 * 3600
+    retention_vacuum_pages: int = 2000  # free pages returned per incremental_vacuum step
 
     # Telegram
     telegram_bot_token: str
     telegram_bot_username: Optional[str] = None
+    telegram_connection_pool_size: int = 16
+    # Bot API endpoint ("<base>/bot"); override for a local Bot API server or benchmarks
+    telegram_api_base_url: Optional[str] = None
+    # "polling" uses getUpdates; "webhook" registers telegram_webhook_url and falls back to polling on failure
+    telegram_update_mode: str = "polling"
+    telegram_webhook_url: Optional[str] = None  # public URL of /api/v1/telegram/webhook
+    telegram_webhook_secret: Optional[str] = None  # required in webhook mode, shared by every process
+    # Service role that registers the webhook; processes with other roles neither register nor poll
+    telegram_webhook_role: str = "all"
+    # Outbound delivery queue (Telegram allows ~30 msg/s overall and ~1 msg/s per chat)
+    telegram_global_messages_per_second: float = 25.0
+    telegram_per_chat_interval_seconds: float = 1.0
+    telegram_delivery_batch_size: int = 100
+    telegram_delivery_poll_seconds: float = 5.0
+    telegram_delivery_max_attempts: int = 5
+    telegram_failed_message_days: int = 7  # undeliverable messages are kept this long for inspection
+    # Rendered registration QR codes kept in memory (about 1 KB each); 0 disables the cache
+    qr_cache_size: int = 1024
 
     # Monitoring settings
     default_check_interval_minutes: int = 20
@@ -27,9 +60,49 @@ class Settings(BaseSettings):
     max_check_interval_seconds: int = 3600
     quiet_hours_start: int = 23  # 23:00 (11 PM)
     quiet_hours_end: int = 8     # 08:00 (8 AM)
+    # Upper bound for SearchPreference.max_pages (result pages crawled per check)
+    max_pages_per_search: int = 5
+    # "all" runs the API plus monitoring, Telegram delivery/polling and retention;
+    # "api" only serves HTTP and leaves that work to a separate "all" process
+    service_role: str = "all"
+    # How often the monitoring process starts preferences registered through other processes; 0 disables
+    monitor_sync_seconds: int = 60
+    # "threads" runs one thread per preference; "asyncio" drives all of them from one loop
+    monitor_mode: str = "threads"
+    monitor_max_concurrent_checks: int = 8
+    # "fixed" checks every check_interval_minutes; "adaptive" splits the Yad2 request budget
+    # across searches by their new-listing rate for the current hour of day
+    monitor_interval_mode: str = "fixed"
+    adaptive_history_days: int = 14
+    # Share of yad2_requests_per_minute the adaptive plan spends; the rest covers extra pages and retries
+    adaptive_budget_share: float = 0.8
+    adaptive_replan_seconds: int = 900
 
     # Yad2
     yad2_base_domain: str = "www.yad2.co.il"
+    # Process-wide request budget per host, shared by every monitored search
+    yad2_requests_per_minute: float = 12.0
+    yad2_request_burst: int = 2
+    # Random extra pause after each granted request so requests are not evenly spaced
+    yad2_request_jitter_seconds: float = 3.0
+    # 403/429 pause the whole host: base * 2**(strikes-1), capped at the max
+    yad2_backoff_base_seconds: float = 60.0
+    yad2_backoff_max_seconds: float = 1800.0
+    # Warm cloudscraper sessions shared by all searches (one kept-alive socket per host each);
+    # 0 gives every search its own session
+    http_session_pool_size: int = 4
+    # Preferences watching the same search share one fetch within this window.
+    # Keep it at or below min_check_interval_seconds.
+    fetch_cache_ttl_seconds: int = 240
+    # Unchanged pages skip the DB diff, but are fully re-diffed at least this often
+    unchanged_page_rediff_seconds: int = 6 * 3600
+    # HTML parser backend: "bs4" or "lxml" (faster, needs the optional `fast` extra)
+    parser_backend: str = "bs4"
+    # Worker processes that parse result pages outside the GIL; 0 parses in the fetching thread
+    parse_pool_size: int = 0
+    # "dom" parses the result cards; "next_data" reads the embedded __NEXT_DATA__ feed
+    # (falls back to "dom" when missing). Listing ids become Yad2 tokens in "next_data".
+    listing_extraction_mode: str = "dom"
 
     # Authentication - supports both single and multiple credentials
     auth_username: Optional[str] = None
@@ -1,10 +1,11 @@
 from contextlib import contextmanager
-from typing import Iterator
+from typing import Iterator, List
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import DeclarativeBase, Session, scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
-from .config import get_settings
+from .config import Settings, get_settings
 
 
 settings = get_settings()
@@ -14,12 +15,50 @@ class Base(DeclarativeBase):
     pass
 
 
+def sqlite_pragmas(settings: Settings) -> List[str]:
+    """Return the PRAGMA statements for the configured storage profile."""
+
+    if settings.sqlite_storage_profile == "default":
+        return []
+
+    return [
+        # Only takes effect for new database files (or after a one-off VACUUM);
+        # lets the retention job hand freed pages back with incremental_vacuum.
+        "PRAGMA auto_vacuum=INCREMENTAL",
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}",
+        f"PRAGMA mmap_size={int(settings.sqlite_mmap_size_bytes)}",
+        # Negative values are interpreted by SQLite as KiB rather than pages
+        f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kib)}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
 engine = create_engine(
     f"sqlite:///{settings.sqlite_db_path()}",
-    connect_args={"check_same_thread": False},
+    connect_args={
+        "check_same_thread": False,
+        "timeout": settings.sqlite_busy_timeout_ms / 1000,
+    },
+    poolclass=QueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout_seconds,
     future=True,
 )
 
+
+@event.listens_for(engine, "connect")
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:  # noqa: ARG001 - SQLAlchemy hook signature
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in sqlite_pragmas(settings):
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
 SessionLocal = scoped_session(
     sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
 )
@@ -44,4 +83,3 @@ def init_db() -> None:
     from . import models  # noqa: F401 - ensure models are imported
 
     Base.metadata.create_all(bind=engine)
-
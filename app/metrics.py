@@ -0,0 +1,112 @@
+"""Prometheus metrics shared by the scraper, monitors and Telegram delivery.
+
+Everything registers on the default ``prometheus_client`` registry, which the
+``/metrics`` route in ``main.py`` renders.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterator, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, REGISTRY
+from prometheus_client.registry import Collector
+
+if TYPE_CHECKING:
+    from .services.fetcher import FetchStats
+
+
+# fetch_page includes the deliberate human-like delays and the 403/429 cool-down
+FETCH_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+
+FETCH_SECONDS = Histogram(
+    "yad2_fetch_seconds",
+    "Time to download one Yad2 results page, including stealth delays.",
+    ["outcome"],
+    buckets=FETCH_BUCKETS,
+)
+YAD2_THROTTLED = Counter(
+    "yad2_throttled",
+    "403/429 responses from Yad2 that put the host into backoff.",
+)
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "yad2_rate_limit_wait_seconds",
+    "Time a fetch waited for the shared per-host request budget.",
+    buckets=FETCH_BUCKETS,
+)
+HTTP_CONNECTIONS = Counter(
+    "yad2_http_connections",
+    "Requests from pooled sessions by whether they reused a kept-alive connection or opened a new one.",
+    ["kind"],
+)
+HTTP_SESSIONS_CREATED = Counter(
+    "yad2_http_sessions_created",
+    "cloudscraper sessions created by the shared session pool.",
+)
+HTTP_SESSIONS_IN_USE = Gauge(
+    "yad2_http_sessions_in_use",
+    "Pooled HTTP sessions currently leased to a fetch.",
+)
+HTTP_SESSION_WAIT_SECONDS = Histogram(
+    "yad2_http_session_wait_seconds",
+    "Time a fetch waited to lease a pooled HTTP session.",
+)
+PARSE_SECONDS = Histogram(
+    "yad2_parse_seconds",
+    "Time spent in StealthYad2Monitor.parse_listings.",
+)
+DIFF_DB_SECONDS = Histogram(
+    "monitor_diff_db_seconds",
+    "Database time of one preference diff (known-row lookup plus upserts).",
+)
+TELEGRAM_SEND_SECONDS = Histogram(
+    "telegram_send_seconds",
+    "Latency of one Telegram sendMessage call.",
+    ["outcome"],
+)
+TELEGRAM_QUEUE_DEPTH = Gauge(
+    "telegram_queue_depth",
+    "Outbound Telegram messages waiting in the delivery queue.",
+)
+QR_CACHE_LOOKUPS = Counter(
+    "telegram_qr_cache_lookups",
+    "Registration QR code lookups served from the cache (hit) or rendered (miss).",
+    ["result"],
+)
+MONITOR_WORKERS = Gauge(
+    "monitor_workers",
+    "Preferences currently being monitored.",
+)
+PREFERENCE_LAG_SECONDS = Gauge(
+    "monitor_preference_lag_seconds",
+    "How late the last check of a preference started relative to its due time.",
+    ["preference_id"],
+)
+
+
+class FetchStatsCollector(Collector):
+    """Expose the ``FetchCoordinator`` work-avoidance counters."""
+
+    def __init__(self) -> None:
+        self.stats: Optional["FetchStats"] = None
+
+    def collect(self) -> Iterator[CounterMetricFamily]:
+        family = CounterMetricFamily(
+            "yad2_fetch_events",
+            "Fetch coordinator events (fetches, cache hits, skipped parses and diffs).",
+            labels=["event"],
+        )
+        if self.stats is not None:
+            for name, value in self.stats.snapshot().items():
+                family.add_metric([name], value)
+        yield family
+
+
+# Registered once per process; each startup only points it at the current stats
+FETCH_STATS = FetchStatsCollector()
+REGISTRY.register(FETCH_STATS)
+
+
+def register_fetch_stats(stats: "FetchStats") -> FetchStatsCollector:
+    FETCH_STATS.stats = stats
+    return FETCH_STATS
@@ -2,7 +2,7 @@ import secrets
 from datetime import datetime
 from typing import Any, Dict, Optional
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, JSON, String, Text
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, JSON, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .db import Base
@@ -34,23 +34,76 @@ class SearchPreference(Base):
     source_url: Mapped[str] = mapped_column(Text, nullable=False)
     query_params: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
     check_interval_minutes: Mapped[int] = mapped_column(Integer, default=20)
+    max_pages: Mapped[int] = mapped_column(Integer, default=1, server_default="1")
+    digest_enabled: Mapped[bool] = mapped_column(Boolean, default=False, server_default="0")
     active: Mapped[bool] = mapped_column(Boolean, default=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user: Mapped[User] = relationship("User", back_populates="preferences")
-    listings: Mapped[list["Listing"]] = relationship("Listing", back_populates="preference", cascade="all, delete-orphan")
+    listing_states: Mapped[list["ListingState"]] = relationship(
+        "ListingState", back_populates="preference", cascade="all, delete-orphan"
+    )
 
 
 class Listing(Base):
+    """One Yad2 listing, stored once no matter how many preferences see it."""
+
     __tablename__ = "listings"
 
+    listing_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    title: Mapped[str] = mapped_column(Text, nullable=False)
+    price: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    price_amount: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # whole shekels
+    location: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    details: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    link: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    price_drop_text: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    rooms: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    floor: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    sqm: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    first_seen_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    states: Mapped[list["ListingState"]] = relationship("ListingState", back_populates="listing")
+    price_history: Mapped[list["ListingPriceHistory"]] = relationship(
+        "ListingPriceHistory", back_populates="listing", order_by="ListingPriceHistory.observed_at"
+    )
+
+    def to_payload(self) -> Dict[str, Any]:
+        """Rebuild the listing dict the scraper produces for notifications."""
+
+        payload: Dict[str, Any] = {
+            "id": self.listing_id,
+            "title": self.title,
+            "price": self.price,
+            "location": self.location,
+            "details": self.details,
+            "link": self.link,
+            "price_dropped": self.price_drop_text is not None,
+        }
+        if self.price_drop_text is not None:
+            payload["price_drop_text"] = self.price_drop_text
+        if self.price_amount is not None:
+            payload["price_value"] = self.price_amount
+        for key in ("rooms", "floor", "sqm"):
+            value = getattr(self, key)
+            if value is not None:
+                payload[key] = value
+        return payload
+
+
+class ListingState(Base):
+    """What one preference last saw and notified for a catalog listing."""
+
+    __tablename__ = "listing_states"
+
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    user_id: Mapped[str] = mapped_column(String(64), ForeignKey("users.id"), index=True, nullable=False)
-    preference_id: Mapped[str] = mapped_column(String(64), ForeignKey("search_preferences.id"), index=True, nullable=False)
-    listing_id: Mapped[str] = mapped_column(String(64), nullable=False)
-    raw_payload: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
+    preference_id: Mapped[str] = mapped_column(String(64), ForeignKey("search_preferences.id"), nullable=False)
+    listing_id: Mapped[str] = mapped_column(String(64), ForeignKey("listings.listing_id"), index=True, nullable=False)
     price: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    price_amount: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    previous_price: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     price_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
     price_drop_notified: Mapped[bool] = mapped_column(Boolean, default=False)
     last_notification_type: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
@@ -58,10 +111,43 @@ class Listing(Base):
     first_seen_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     last_seen_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
-    preference: Mapped[SearchPreference] = relationship("SearchPreference", back_populates="listings")
-    user: Mapped[User] = relationship("User")
+    preference: Mapped[SearchPreference] = relationship("SearchPreference", back_populates="listing_states")
+    listing: Mapped[Listing] = relationship("Listing", back_populates="states")
+
 
+Index("ix_listing_state_preference_listing", ListingState.preference_id, ListingState.listing_id, unique=True)
+
+
+class ListingPriceHistory(Base):
+    """Append-only log of the prices observed for a catalog listing."""
+
+    __tablename__ = "listing_price_history"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    listing_id: Mapped[str] = mapped_column(String(64), ForeignKey("listings.listing_id"), nullable=False)
+    price_amount: Mapped[int] = mapped_column(Integer, nullable=False)
+    price: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    observed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    listing: Mapped[Listing] = relationship("Listing", back_populates="price_history")
+
+
+Index("ix_price_history_listing_observed", ListingPriceHistory.listing_id, ListingPriceHistory.observed_at)
+
+
+class OutboundMessage(Base):
+    """Telegram message waiting to be delivered by the delivery queue."""
+
+    __tablename__ = "outbound_messages"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    chat_id: Mapped[str] = mapped_column(String(128), nullable=False)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), default="pending", nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
-Index("ix_listing_user_listing", Listing.user_id, Listing.listing_id, unique=True)
-Index("ix_listing_preference_listing", Listing.preference_id, Listing.listing_id)
 
+Index("ix_outbound_status_due", OutboundMessage.status, OutboundMessage.next_attempt_at)
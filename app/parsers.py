@@ -0,0 +1,464 @@
+"""Pluggable HTML backends for turning a Yad2 results page into listing dicts.
+
+Every DOM backend returns exactly the same dicts as the original
+BeautifulSoup implementation; only the parsing engine differs. The
+``__NEXT_DATA__`` extractor at the bottom skips the DOM entirely.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+ListingDict = Dict[str, Any]
+
+# Yad2 feed markup (CSS-module class names)
+ITEM_LINK_CLASS = "item-layout_itemLink__CZZ7w"
+PRICE_DROP_TAG_CLASS = "text-tag_textTag__mQeO_ item-image_imageTag__EaPPF"
+ITEM_CONTENT_CLASS = "item-layout_itemContent__qT_A8"
+PRICE_CLASS = "feed-item-price_price__ygoeF"
+HEADING_CLASS = "item-data-content_heading__tphH4"
+INFO_LINE_CLASS = "item-data-content_itemInfoLine__AeoPP"
+
+NEW_PROJECT_TAG = "פרויקט חדש"
+
+_PRICE_DIGITS = re.compile(r"\d[\d,]*")
+
+
+def parse_price_amount(price: Optional[str]) -> Optional[int]:
+    """Parse a display price such as ``"4,500 ₪"`` into whole shekels.
+
+    Returns ``None`` for placeholders like ``"No price"`` or text without digits.
+    """
+
+    if not price:
+        return None
+    match = _PRICE_DIGITS.search(price)
+    if match is None:
+        return None
+    return int(match.group().replace(",", ""))
+
+
+def listing_price_amount(listing: ListingDict) -> Optional[int]:
+    """Integer price of a listing dict, preferring the feed's ``price_value``."""
+
+    value = listing.get("price_value")
+    if isinstance(value, (int, float)):
+        return int(value)
+    return parse_price_amount(listing.get("price"))
+
+
+def build_listing(
+    href: str,
+    price_drop_text: Optional[str],
+    has_content: bool,
+    price: Optional[str],
+    title: Optional[str],
+    info_lines: List[str],
+) -> Optional[ListingDict]:
+    """Assemble a listing dict from the raw fields of one feed card.
+
+    ``price_drop_text`` is ``None`` when the card has no price-drop tag.
+    Returns ``None`` for cards that should be ignored (new projects, missing
+    content or missing essential fields).
+    """
+
+    listing: ListingDict = {}
+
+    if href:
+        full_link = "https://www.yad2.co.il" + href if href.startswith("/") else href
+        # Remove everything after the question mark
+        listing["link"] = full_link.split("?", 1)[0]
+    else:
+        listing["link"] = "No link"
+
+    listing["price_dropped"] = price_drop_text is not None
+    if listing["price_dropped"]:
+        listing["price_drop_text"] = price_drop_text
+
+    # Filter out "פרויקט חדש" (new project) listings
+    if listing.get("price_drop_text") == NEW_PROJECT_TAG:
+        return None
+
+    if not has_content:
+        return None
+
+    listing["price"] = price if price is not None else "No price"
+    listing["title"] = title if title is not None else "No title"
+    listing["location"] = info_lines[0] if len(info_lines) >= 1 else "No location"
+    listing["details"] = info_lines[1] if len(info_lines) >= 2 else "No details"
+
+    # Filter out listings with missing essential data
+    if listing["price"] == "No price" or listing["title"] == "No title" or listing["location"] == "No location":
+        return None
+
+    # Create unique ID using title, location, and link
+    listing_text = f"{listing['title']}_{listing['location']}_{listing['link']}"
+    listing["id"] = hashlib.md5(listing_text.encode()).hexdigest()
+    listing["timestamp"] = datetime.now().isoformat()
+    return listing
+
+
+class ListingParser(ABC):
+    """Turn the HTML of a results page into listing dicts."""
+
+    name: str = ""
+
+    @abstractmethod
+    def parse(self, html: str) -> List[ListingDict]:
+        raise NotImplementedError
+
+
+class SoupListingParser(ListingParser):
+    """Reference backend built on BeautifulSoup's pure-Python ``html.parser``."""
+
+    name = "bs4"
+
+    def parse(self, html: str) -> List[ListingDict]:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, "html.parser")
+        items = soup.find_all("a", class_=ITEM_LINK_CLASS)
+        logger.debug("Found %d potential listings", len(items))
+
+        listings: List[ListingDict] = []
+        for item in items:
+            try:
+                listing = self.extract(item)
+            except Exception as exc:  # noqa: BLE001 - one broken card must not drop the page
+                logger.warning("Error parsing listing: %s", exc)
+                continue
+            if listing:
+                listings.append(listing)
+        return listings
+
+    def extract(self, item) -> Optional[ListingDict]:
+        """Extract a listing from a single ``<a>`` feed card tag."""
+
+        price_drop_elem = item.find("span", class_=PRICE_DROP_TAG_CLASS)
+        price_drop_text = price_drop_elem.get_text(strip=True) if price_drop_elem is not None else None
+
+        content_div = item.find("div", class_=ITEM_CONTENT_CLASS)
+        price = title = None
+        info_lines: List[str] = []
+        if content_div:
+            price_elem = content_div.find("span", class_=PRICE_CLASS)
+            price = price_elem.get_text(strip=True) if price_elem else None
+            title_elem = content_div.find("span", class_=HEADING_CLASS)
+            title = title_elem.get_text(strip=True) if title_elem else None
+            info_lines = [line.get_text(strip=True) for line in content_div.find_all("span", class_=INFO_LINE_CLASS)]
+
+        return build_listing(item.get("href", ""), price_drop_text, bool(content_div), price, title, info_lines)
+
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class LxmlListingParser(ListingParser):
+    """Compiled backend using libxml2 with precompiled XPath selectors."""
+
+    name = "lxml"
+
+    def __init__(self) -> None:
+        from lxml import etree
+        from lxml import html as lxml_html
+
+        self._etree = etree
+        self._html = lxml_html
+        self._parser = lxml_html.HTMLParser(encoding="utf-8")
+        self._items = etree.XPath(f"//a[{_has_class(ITEM_LINK_CLASS)}]")
+        self._price_drop = etree.XPath(f".//span[@class='{PRICE_DROP_TAG_CLASS}']")
+        self._content = etree.XPath(f".//div[{_has_class(ITEM_CONTENT_CLASS)}]")
+        self._price = etree.XPath(f".//span[{_has_class(PRICE_CLASS)}]")
+        self._heading = etree.XPath(f".//span[{_has_class(HEADING_CLASS)}]")
+        self._info_lines = etree.XPath(f".//span[{_has_class(INFO_LINE_CLASS)}]")
+        self._text = etree.XPath(".//text()")
+
+    def _get_text(self, element) -> str:
+        # Same semantics as BeautifulSoup's get_text(strip=True)
+        return "".join(part.strip() for part in self._text(element))
+
+    def _first_text(self, selector, element) -> Optional[str]:
+        found = selector(element)
+        return self._get_text(found[0]) if found else None
+
+    def parse(self, html: str) -> List[ListingDict]:
+        if not html or not html.strip():
+            return []
+
+        try:
+            root = self._html.document_fromstring(html.encode("utf-8"), parser=self._parser)
+        except (self._etree.ParserError, ValueError) as exc:
+            logger.warning("lxml could not parse page: %s", exc)
+            return []
+
+        items = self._items(root)
+        logger.debug("Found %d potential listings", len(items))
+
+        listings: List[ListingDict] = []
+        for item in items:
+            try:
+                listing = self.extract(item)
+            except Exception as exc:  # noqa: BLE001 - one broken card must not drop the page
+                logger.warning("Error parsing listing: %s", exc)
+                continue
+            if listing:
+                listings.append(listing)
+        return listings
+
+    def extract(self, item) -> Optional[ListingDict]:
+        price_drop_text = self._first_text(self._price_drop, item)
+
+        content = self._content(item)
+        price = title = None
+        info_lines: List[str] = []
+        if content:
+            content_div = content[0]
+            price = self._first_text(self._price, content_div)
+            title = self._first_text(self._heading, content_div)
+            info_lines = [self._get_text(line) for line in self._info_lines(content_div)]
+
+        return build_listing(item.get("href", ""), price_drop_text, bool(content), price, title, info_lines)
+
+
+PARSER_BACKENDS = {
+    SoupListingParser.name: SoupListingParser,
+    LxmlListingParser.name: LxmlListingParser,
+}
+
+
+def get_parser(name: str = "bs4") -> ListingParser:
+    """Instantiate the parser backend ``name``, falling back to BeautifulSoup.
+
+    The fallback covers unknown names as well as a missing optional ``lxml``
+    install, so a misconfigured backend degrades to slower parsing rather
+    than a crash.
+    """
+
+    backend = PARSER_BACKENDS.get(name)
+    if backend is None:
+        logger.warning("Unknown parser backend %r, using bs4", name)
+        return SoupListingParser()
+
+    try:
+        return backend()
+    except ImportError:
+        logger.warning("Parser backend %r is not installed, using bs4", name)
+        return SoupListingParser()
+
+
+# --- Next.js embedded feed -------------------------------------------------
+
+NEXT_DATA_MARKER = '<script id="__NEXT_DATA__"'
+FEED_KEY = '"feed":'
+# Feed sections that hold new-construction projects rather than rentals/resales
+SKIPPED_FEED_SECTIONS = {"yad1"}
+PRICE_DROP_TAG_NAMES = {"מחיר ירד"}
+ITEM_PATH = "/realestate/item/"
+
+_json_decoder = json.JSONDecoder()
+
+
+def find_next_data(html: str) -> Optional[str]:
+    """Return the raw text of the ``__NEXT_DATA__`` script without parsing the page."""
+
+    start = html.find(NEXT_DATA_MARKER)
+    if start == -1:
+        return None
+    start = html.find(">", start)
+    if start == -1:
+        return None
+    end = html.find("</script>", start)
+    if end == -1:
+        return None
+    return html[start + 1 : end]
+
+
+def _locate_feed(blob: str) -> Optional[Tuple[Dict[str, Any], int, int]]:
+    """The decoded ``"feed"`` object of a Next.js data blob and its ``(start, end)`` offsets."""
+
+    position = blob.find(FEED_KEY)
+    while position != -1:
+        start = position + len(FEED_KEY)
+        while start < len(blob) and blob[start].isspace():
+            start += 1
+        try:
+            feed, end = _json_decoder.raw_decode(blob, start)
+        except ValueError:
+            feed = None
+        if isinstance(feed, dict) and any(isinstance(value, list) for value in feed.values()):
+            return feed, start, end
+        position = blob.find(FEED_KEY, position + len(FEED_KEY))
+    return None
+
+
+def decode_feed(blob: str) -> Optional[Dict[str, Any]]:
+    """Decode only the ``"feed"`` object of a Next.js data blob.
+
+    The rest of the blob (translations, SEO data, dehydrated queries) is never
+    materialized; ``raw_decode`` stops as soon as the feed object closes.
+    """
+
+    located = _locate_feed(blob)
+    return located[0] if located is not None else None
+
+
+def _text_of(value: Any) -> Optional[str]:
+    if isinstance(value, dict):
+        value = value.get("text")
+    if value is None or value == "":
+        return None
+    return str(value)
+
+
+def listing_region(html: str) -> str:
+    """Return the part of a results page that determines its listings.
+
+    Used to fingerprint a page cheaply: the embedded feed when present,
+    otherwise the span from the first to the last result card with
+    whitespace collapsed. Returns an empty string when neither is found.
+    """
+
+    blob = find_next_data(html)
+    if blob is not None:
+        # Only the feed object itself: the rest of the blob (dehydrated query
+        # state, buildId) changes on every request
+        located = _locate_feed(blob)
+        if located is not None:
+            _, start, end = located
+            return blob[start:end]
+
+    first = html.find(ITEM_LINK_CLASS)
+    if first == -1:
+        return ""
+    end = html.find("</a>", html.rfind(ITEM_LINK_CLASS))
+    region = html[first:end] if end != -1 else html[first:]
+    return " ".join(region.split())
+
+
+def build_feed_listing(item: Dict[str, Any]) -> Optional[ListingDict]:
+    """Map one Yad2 feed item to a listing dict with structured fields.
+
+    The dict carries the same keys as the DOM parsers (so notifications and
+    storage work unchanged) plus ``token``, ``price_value``, ``rooms``,
+    ``floor`` and ``sqm``. The listing ``id`` is the Yad2 token, which stays
+    stable across frontend deploys.
+    """
+
+    token = item.get("token")
+    price_value = item.get("price")
+    if not token or not isinstance(price_value, (int, float)):
+        return None
+
+    address = item.get("address") or {}
+    house = address.get("house") or {}
+    details = item.get("additionalDetails") or {}
+
+    street = _text_of(address.get("street"))
+    house_number = house.get("number")
+    title = " ".join(str(part) for part in (street, house_number) if part) or _text_of(address.get("neighborhood"))
+
+    location_parts = [
+        _text_of(details.get("property")),
+        _text_of(address.get("neighborhood")),
+        _text_of(address.get("city")),
+    ]
+    location = ", ".join(part for part in location_parts if part)
+    if not title or not location:
+        return None
+
+    rooms = details.get("roomsCount")
+    floor = house.get("floor")
+    sqm = details.get("squareMeter")
+    detail_parts = []
+    if rooms is not None:
+        detail_parts.append(f"{rooms:g} חדרים" if isinstance(rooms, (int, float)) else f"{rooms} חדרים")
+    if floor is not None:
+        detail_parts.append(f"קומה {floor}")
+    if sqm is not None:
+        detail_parts.append(f'{sqm} מ"ר')
+
+    tag_names = {tag.get("name") for tag in item.get("tags") or [] if isinstance(tag, dict)}
+    price_dropped = bool(tag_names & PRICE_DROP_TAG_NAMES) or item.get("priceBeforeTag") is not None
+
+    listing: ListingDict = {
+        "link": f"https://www.yad2.co.il{ITEM_PATH}{token}",
+        "price_dropped": price_dropped,
+        "price": f"{int(price_value):,} ₪",
+        "title": title,
+        "location": location,
+        "details": " • ".join(detail_parts) or "No details",
+        "id": str(token),
+        "token": str(token),
+        "price_value": int(price_value),
+        "rooms": rooms,
+        "floor": floor,
+        "sqm": sqm,
+        "timestamp": datetime.now().isoformat(),
+    }
+    if price_dropped:
+        listing["price_drop_text"] = next(iter(tag_names & PRICE_DROP_TAG_NAMES), "מחיר ירד")
+    return listing
+
+
+def token_from_link(link: str) -> Optional[str]:
+    """Yad2 token of an item link: the last path segment under ``/realestate/item/``."""
+
+    path = link.split("?", 1)[0].rstrip("/")
+    if ITEM_PATH not in path:
+        return None
+    return path.rsplit("/", 1)[-1] or None
+
+
+def key_by_token(listings: List[ListingDict]) -> List[ListingDict]:
+    """Re-key DOM-parsed listings by their Yad2 token, as the feed extractor does.
+
+    Used when a page in ``next_data`` mode has no feed, so the DOM fallback
+    does not report every listing as new under a different id.
+    """
+
+    for listing in listings:
+        token = token_from_link(listing.get("link", ""))
+        if token:
+            listing["id"] = listing["token"] = token
+    return listings
+
+
+def extract_next_data_listings(html: str) -> Optional[List[ListingDict]]:
+    """Extract listings from the embedded ``__NEXT_DATA__`` feed.
+
+    Returns ``None`` when the page carries no usable feed, so callers can fall
+    back to a DOM parser; an empty list means the feed is present but empty.
+    """
+
+    blob = find_next_data(html)
+    if blob is None:
+        return None
+
+    feed = decode_feed(blob)
+    if feed is None:
+        return None
+
+    listings: List[ListingDict] = []
+    seen = set()
+    for section, items in feed.items():
+        if section in SKIPPED_FEED_SECTIONS or not isinstance(items, list):
+            continue
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            listing = build_feed_listing(item)
+            if listing and listing["id"] not in seen:
+                seen.add(listing["id"])
+                listings.append(listing)
+    return listings
@@ -14,6 +14,8 @@ class RegisterUserRequest(BaseModel):
     label: Optional[str] = Field(default=None, max_length=255)
     search_url: AnyHttpUrl
     query_params: Dict[str, Any] = Field(default_factory=dict)
+    max_pages: Optional[int] = Field(default=None, ge=1)
+    digest_enabled: Optional[bool] = None
 
 
 class RegisterUserResponse(BaseModel):
@@ -41,3 +43,31 @@ class UserStatusResponse(BaseModel):
     preferences: List[Dict[str, Any]]
     pending_notifications: int = 0
 
+
+
+class PricePoint(BaseModel):
+    price_amount: int
+    price: Optional[str]
+    observed_at: datetime
+
+
+class PriceHistoryResponse(BaseModel):
+    listing_id: str
+    title: str
+    link: Optional[str]
+    current_price_amount: Optional[int]
+    history: List[PricePoint]
+
+
+class PriceDrop(BaseModel):
+    listing_id: str
+    title: str
+    link: Optional[str]
+    peak_price_amount: int
+    current_price_amount: int
+    drop_amount: int
+
+
+class PriceDropsResponse(BaseModel):
+    preference_id: str
+    drops: List[PriceDrop]
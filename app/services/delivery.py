@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..db import session_scope
+from ..models import OutboundMessage
+from .telegram import send_markdown_message
+
+if TYPE_CHECKING:
+    from telegram import Bot
+    from telegram.error import RetryAfter
+
+    from .telegram import TelegramService
+
+
+logger = logging.getLogger(__name__)
+
+
+QueuedMessage = Tuple[int, str, str]  # (row id, chat_id, text)
+# How often failed rows older than telegram_failed_message_days are deleted
+PURGE_INTERVAL_SECONDS = 3600
+# Batches of due rows _load_due scans past busy chats before returning what it has
+LOAD_SCAN_BATCHES = 4
+
+
+def retry_after_seconds(exc: "RetryAfter") -> float:
+    """Return the flood-control delay of ``exc`` in seconds (int or timedelta)."""
+
+    retry_after = exc.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class AsyncRateLimiter:
+    """Space out acquisitions so at most ``rate`` happen per second."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            delay = self._next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_at = max(self._next_at, loop.time()) + self.interval
+
+    def pause(self, seconds: float) -> None:
+        self._next_at = max(self._next_at, asyncio.get_running_loop().time() + seconds)
+
+
+class TelegramDeliveryQueue:
+    """Persistent outbound queue drained by a single async sender.
+
+    Workers call :meth:`enqueue`, which only inserts rows into
+    ``outbound_messages``. The sender loads due rows, keeps per-chat order,
+    stays under Telegram's global and per-chat limits and honors
+    ``RetryAfter`` by pausing and rescheduling instead of dropping messages.
+    Delivered rows are deleted; rows that keep failing are marked ``failed``
+    and purged after ``telegram_failed_message_days``. Each chat is drained by
+    its own task, so one chat's backlog does not delay the others.
+    The sender runs as a task on the ``TelegramService`` loop and shares its
+    pooled ``Bot`` client.
+    """
+
+    def __init__(self, telegram_service: "TelegramService") -> None:
+        self.telegram_service = telegram_service
+        self.settings = get_settings()
+        self._stop_event = threading.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[Future] = None
+
+    # -- producer side -----------------------------------------------------
+
+    def enqueue(self, chat_id: str | int, messages: Iterable[str], session: Optional[Session] = None) -> int:
+        """Insert ``messages`` for ``chat_id``; the sender is woken once they are committed.
+
+        Callers inside a ``session_scope`` must pass its ``session``: scopes share
+        the thread's scoped session, so opening another one here would commit
+        and close the caller's transaction halfway through.
+        """
+
+        now = datetime.utcnow()
+        rows = [
+            OutboundMessage(chat_id=str(chat_id), text=text, next_attempt_at=now, created_at=now)
+            for text in messages
+        ]
+        if not rows:
+            return 0
+
+        if session is not None:
+            session.add_all(rows)
+            event.listen(session, "after_commit", lambda _session: self._wake(), once=True)
+            return len(rows)
+
+        with session_scope() as session:
+            session.add_all(rows)
+        self._wake()
+        return len(rows)
+
+    def pending_count(self) -> int:
+        with session_scope() as session:
+            return session.execute(
+                select(func.count()).select_from(OutboundMessage).where(OutboundMessage.status == "pending")
+            ).scalar_one()
+
+    def start(self) -> None:
+        logger.info("Starting Telegram delivery queue")
+        self._task = self.telegram_service.submit(self._run())
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self._wake()
+        if self._task is not None:
+            try:
+                self._task.result(timeout=10)
+            except Exception:  # noqa: BLE001 - best effort during shutdown
+                logger.exception("Telegram delivery queue did not stop cleanly")
+            logger.info("Telegram delivery queue stopped")
+
+    def _wake(self) -> None:
+        if self._loop is not None and self._wakeup is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    # -- sender side -------------------------------------------------------
+
+    async def _run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        bot = self.telegram_service.bot
+        limiter = AsyncRateLimiter(self.settings.telegram_global_messages_per_second)
+        chat_ready_at: Dict[str, float] = {}
+        # One drain task per chat; a chat with a long backlog never holds back the others
+        draining: Dict[str, asyncio.Task] = {}
+        purged_at: Optional[float] = None
+
+        def finished(chat_id: str, task: asyncio.Task) -> None:
+            draining.pop(chat_id, None)
+            if not task.cancelled() and task.exception() is not None:
+                logger.error("Delivery to chat %s failed", chat_id, exc_info=task.exception())
+            # Load the chat's next messages, if any
+            self._wakeup.set()
+
+        while not self._stop_event.is_set():
+            self._wakeup.clear()
+            limit = self.settings.telegram_delivery_batch_size
+            try:
+                batch = await asyncio.to_thread(self._load_due, limit, set(draining))
+                if purged_at is None or self._loop.time() - purged_at >= PURGE_INTERVAL_SECONDS:
+                    purged_at = self._loop.time()
+                    await asyncio.to_thread(self._purge_failed)
+            except Exception:  # noqa: BLE001 - keep the sender alive across DB hiccups
+                logger.exception("Failed to load outbound Telegram messages")
+                batch = []
+
+            by_chat: "OrderedDict[str, List[QueuedMessage]]" = OrderedDict()
+            for item in batch:
+                by_chat.setdefault(item[1], []).append(item)
+            for chat_id, items in by_chat.items():
+                task = asyncio.create_task(self._drain_chat(bot, limiter, chat_ready_at, items))
+                draining[chat_id] = task
+                task.add_done_callback(lambda task, chat_id=chat_id: finished(chat_id, task))
+            # Forget chats whose interval has passed so the map tracks active chats only
+            now = self._loop.time()
+            for chat_id in [chat for chat, ready in chat_ready_at.items() if ready <= now and chat not in draining]:
+                del chat_ready_at[chat_id]
+            if len(batch) >= limit:
+                # More chats may be due behind this batch
+                continue
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.settings.telegram_delivery_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+        if draining:
+            await asyncio.gather(*draining.values(), return_exceptions=True)
+
+    async def _drain_chat(
+        self,
+        bot: "Bot",
+        limiter: AsyncRateLimiter,
+        chat_ready_at: Dict[str, float],
+        items: List[QueuedMessage],
+    ) -> None:
+        """Send one chat's messages in order, at most one per chat interval."""
+
+        from telegram.error import RetryAfter, TelegramError
+
+        loop = asyncio.get_running_loop()
+        per_chat_interval = self.settings.telegram_per_chat_interval_seconds
+
+        for message_id, chat_id, text in items:
+            if self._stop_event.is_set():
+                return
+
+            delay = chat_ready_at.get(chat_id, 0.0) - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await limiter.acquire()
+
+            try:
+                await send_markdown_message(bot, chat_id, text)
+            except RetryAfter as exc:
+                wait = retry_after_seconds(exc)
+                logger.warning("Telegram flood control, retrying in %.0fs", wait)
+                limiter.pause(wait)
+                chat_ready_at[chat_id] = loop.time() + wait
+                # Reschedule the rest of this chat too so ordering is preserved
+                remaining = [item[0] for item in items if item[0] >= message_id]
+                await asyncio.to_thread(self._defer, remaining, wait)
+                return
+            except TelegramError as exc:
+                logger.error("Failed to deliver Telegram message %s: %s", message_id, exc)
+                await asyncio.to_thread(self._record_failure, message_id, str(exc))
+            else:
+                await asyncio.to_thread(self._mark_sent, message_id)
+            chat_ready_at[chat_id] = loop.time() + per_chat_interval
+
+    # -- persistence helpers (run in a worker thread) ------------------------
+
+    def _load_due(self, limit: int, busy_chats: Set[str]) -> List[QueuedMessage]:
+        """Due messages, oldest first, skipping chats that are still being drained.
+
+        Busy chats are filtered in Python so the query's parameter count stays
+        fixed however many chats are draining; rows are scanned in id order,
+        ``limit`` at a time, for at most ``LOAD_SCAN_BATCHES`` batches.
+        """
+
+        query = select(OutboundMessage.id, OutboundMessage.chat_id, OutboundMessage.text).where(
+            OutboundMessage.status == "pending",
+            OutboundMessage.next_attempt_at <= datetime.utcnow(),
+        )
+        due: List[QueuedMessage] = []
+        last_id = 0
+        with session_scope() as session:
+            for _ in range(LOAD_SCAN_BATCHES):
+                rows = session.execute(
+                    query.where(OutboundMessage.id > last_id).order_by(OutboundMessage.id).limit(limit)
+                ).all()
+                due.extend((row.id, row.chat_id, row.text) for row in rows if row.chat_id not in busy_chats)
+                if len(due) >= limit or len(rows) < limit:
+                    break
+                last_id = rows[-1].id
+        return due[:limit]
+
+    def _purge_failed(self) -> None:
+        cutoff = datetime.utcnow() - timedelta(days=self.settings.telegram_failed_message_days)
+        with session_scope() as session:
+            removed = session.execute(
+                delete(OutboundMessage).where(
+                    OutboundMessage.status == "failed",
+                    OutboundMessage.created_at < cutoff,
+                )
+            ).rowcount
+        if removed:
+            logger.info("Purged %d failed Telegram messages", removed)
+
+    def _mark_sent(self, message_id: int) -> None:
+        with session_scope() as session:
+            session.execute(delete(OutboundMessage).where(OutboundMessage.id == message_id))
+
+    def _defer(self, message_ids: List[int], seconds: float) -> None:
+        with session_scope() as session:
+            session.execute(
+                update(OutboundMessage)
+                .where(OutboundMessage.id.in_(message_ids))
+                .values(next_attempt_at=datetime.utcnow() + timedelta(seconds=seconds))
+            )
+
+    def _record_failure(self, message_id: int, error: str) -> None:
+        with session_scope() as session:
+            message = session.get(OutboundMessage, message_id)
+            if message is None:
+                return
+            message.attempts += 1
+            message.last_error = error
+            if message.attempts >= self.settings.telegram_delivery_max_attempts:
+                message.status = "failed"
+            else:
+                backoff = min(3600, 30 * 2 ** (message.attempts - 1))
+                message.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff)
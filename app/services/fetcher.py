@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Hashable, List, Optional, Set
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .. import metrics
+from ..config import get_settings
+from ..parsers import listing_region
+from ..yad_scrapper import StealthYad2Monitor
+from .parsepool import ParsePool
+from .ratelimit import get_host_limiter
+from .sessions import SessionPool
+
+
+logger = logging.getLogger(__name__)
+
+
+ListingDict = Dict[str, Any]
+
+# Query parameter and values Yad2 uses for "newest first" ordering
+DATE_SORT_PARAM = "order"
+DATE_SORT_VALUES = {"1"}
+
+
+def canonicalize_search_url(url: str) -> str:
+    """Normalize a Yad2 search URL so equivalent searches share one cache key.
+
+    Scheme and host are lowercased, the fragment is dropped, empty query
+    parameters are removed and the remaining ones are sorted.
+    """
+
+    parts = urlsplit(url.strip())
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if value != "")
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+
+def page_url(url: str, page: int) -> str:
+    """Return the URL of result page ``page`` (1-based) for a search URL."""
+
+    if page <= 1:
+        return url
+    parts = urlsplit(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != "page"]
+    query.append(("page", str(page)))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), parts.fragment))
+
+
+def is_sorted_by_date(url: str) -> bool:
+    """Whether the search lists the newest ads first (Yad2 ``order=1``)."""
+
+    params = dict(parse_qsl(urlsplit(url).query))
+    return params.get(DATE_SORT_PARAM) in DATE_SORT_VALUES
+
+
+def fingerprint_page(html: str) -> Optional[str]:
+    """Hash the listing region of a page, or ``None`` if it has none."""
+
+    region = listing_region(html)
+    if not region:
+        return None
+    return hashlib.blake2b(region.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@dataclass
+class FetchResult:
+    url: str
+    listings: List[ListingDict]
+    fetched_at: float
+    ok: bool
+    content_hash: Optional[str] = None
+
+
+@dataclass
+class FetchStats:
+    """Counters for how much fetch, parse and diff work was avoided."""
+
+    fetches: int = 0
+    cache_hits: int = 0
+    not_modified: int = 0
+    content_unchanged: int = 0
+    parses: int = 0
+    diffs_skipped: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {item.name: getattr(self, item.name) for item in fields(self) if not item.name.startswith("_")}
+
+
+@dataclass
+class _SearchEntry:
+    monitor: StealthYad2Monitor
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    result: Optional[FetchResult] = None
+    last_good: Optional[FetchResult] = None
+    subscribers: Set[Hashable] = field(default_factory=set)
+
+
+class FetchCoordinator:
+    """Fetch and parse every unique search URL at most once per TTL.
+
+    Preferences subscribe with their ``source_url``; all preferences that map
+    to the same canonical URL share one ``StealthYad2Monitor`` and one parsed
+    listing set, so outbound requests scale with unique searches rather than
+    with users. Subscriptions are keyed by the subscribing object (the
+    preference's monitor job), so a job closed late cannot drop the
+    subscriptions of a newer job for the same preference.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None) -> None:
+        settings = get_settings()
+        self.ttl_seconds = settings.fetch_cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.parser_backend = settings.parser_backend
+        self.extraction_mode = settings.listing_extraction_mode
+        self.rate_limiter = get_host_limiter()
+        self.request_jitter_seconds = settings.yad2_request_jitter_seconds
+        self.session_pool: Optional[SessionPool] = None
+        if settings.http_session_pool_size > 0:
+            self.session_pool = SessionPool(settings.http_session_pool_size)
+        # Set by the app when parse_pool_size > 0; None parses in the fetching thread
+        self.parse_pool: Optional[ParsePool] = None
+        self._entries: Dict[str, _SearchEntry] = {}
+        self._subscriptions: Dict[Hashable, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.stats = FetchStats()
+
+    def subscribe(self, subscriber: Hashable, url: str) -> StealthYad2Monitor:
+        """Register ``subscriber`` for ``url`` and return the shared monitor.
+
+        Subscribing to a different URL than before drops the subscriber's
+        previous subscriptions, including any extra result pages.
+        """
+
+        key = canonicalize_search_url(url)
+        with self._lock:
+            previous = self._subscriptions.get(subscriber, set())
+            for stale in previous - {key}:
+                self._release(subscriber, stale)
+            return self._attach(subscriber, key, url).monitor
+
+    def _attach(self, subscriber: Optional[Hashable], key: str, url: str) -> _SearchEntry:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _SearchEntry(monitor=self._new_monitor(url))
+            self._entries[key] = entry
+            logger.info("Tracking new search %s", key)
+
+        if subscriber is not None:
+            entry.subscribers.add(subscriber)
+            self._subscriptions.setdefault(subscriber, set()).add(key)
+        return entry
+
+    def _new_monitor(self, url: str) -> StealthYad2Monitor:
+        return StealthYad2Monitor(
+            url,
+            parser_backend=self.parser_backend,
+            extraction_mode=self.extraction_mode,
+            rate_limiter=self.rate_limiter,
+            request_jitter_seconds=self.request_jitter_seconds,
+            session_pool=self.session_pool,
+        )
+
+    def unsubscribe(self, subscriber: Hashable) -> None:
+        with self._lock:
+            for key in list(self._subscriptions.get(subscriber, ())):
+                self._release(subscriber, key)
+
+    def _release(self, subscriber: Hashable, key: str) -> None:
+        keys = self._subscriptions.get(subscriber)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._subscriptions[subscriber]
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry.subscribers.discard(subscriber)
+        if not entry.subscribers:
+            del self._entries[key]
+            logger.info("No subscribers left for search %s", key)
+
+    def get_listings(self, url: str, subscriber: Optional[Hashable] = None) -> FetchResult:
+        """Return the parsed listings for ``url``, fetching only if the cache is stale.
+
+        Concurrent callers for the same search block on the entry lock, so only
+        the first one performs the download while the rest reuse its result.
+        Each caller receives its own shallow copies of the listing dicts.
+        Passing ``subscriber`` subscribes it to ``url`` as well, which is
+        how follow-up result pages stay cached and get cleaned up.
+        """
+
+        key = canonicalize_search_url(url)
+        with self._lock:
+            entry = self._attach(subscriber, key, url)
+
+        with entry.lock:
+            result = entry.result
+            if result is None or time.monotonic() - result.fetched_at >= self.ttl_seconds:
+                result = self._fetch(key, entry)
+                entry.result = result
+                if result.ok:
+                    entry.last_good = result
+            else:
+                self.stats.incr("cache_hits")
+                logger.debug("Reusing cached fetch for %s (%d subscribers)", key, len(entry.subscribers))
+
+        return FetchResult(
+            url=result.url,
+            listings=[listing.copy() for listing in result.listings],
+            fetched_at=result.fetched_at,
+            ok=result.ok,
+            content_hash=result.content_hash,
+        )
+
+    def _fetch(self, key: str, entry: _SearchEntry) -> FetchResult:
+        """Download ``key`` and parse it unless the content provably did not change.
+
+        A 304 answer to the conditional request, or a page whose listing region
+        hashes the same as the last good fetch, reuses the previous listings
+        without parsing.
+        """
+
+        previous = entry.last_good
+        self.stats.incr("fetches")
+        started = time.perf_counter()
+        html = entry.monitor.fetch_page(conditional=previous is not None)
+        outcome = "not_modified" if html is None else ("ok" if html else "error")
+        metrics.FETCH_SECONDS.labels(outcome).observe(time.perf_counter() - started)
+
+        if html is None and previous is not None:
+            self.stats.incr("not_modified")
+            return FetchResult(key, previous.listings, time.monotonic(), True, previous.content_hash)
+
+        if not html:
+            return FetchResult(url=key, listings=[], fetched_at=time.monotonic(), ok=False)
+
+        content_hash = fingerprint_page(html)
+        if previous is not None and content_hash is not None and content_hash == previous.content_hash:
+            self.stats.incr("content_unchanged")
+            logger.debug("Listing region unchanged for %s, skipping parse", key)
+            return FetchResult(key, previous.listings, time.monotonic(), True, content_hash)
+
+        self.stats.incr("parses")
+        with metrics.PARSE_SECONDS.time():
+            if self.parse_pool is not None:
+                listings = self.parse_pool.parse(html, self.parser_backend, self.extraction_mode)
+            else:
+                listings = entry.monitor.parse_listings(html)
+        return FetchResult(url=key, listings=listings, fetched_at=time.monotonic(), ok=True, content_hash=content_hash)
+
+    def close(self) -> None:
+        if self.session_pool is not None:
+            self.session_pool.close()
+
+    def subscriber_count(self, url: str) -> int:
+        with self._lock:
+            entry = self._entries.get(canonicalize_search_url(url))
+            return len(entry.subscribers) if entry else 0
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models import ListingState, SearchPreference
+from .fetcher import canonicalize_search_url, is_sorted_by_date
+
+
+logger = logging.getLogger(__name__)
+
+
+# New listings per hour assumed for every search, so dead ones are still polled
+PRIOR_RATE_PER_HOUR = 0.05
+# Weight of the hour-of-day rate against the search's all-day average
+HOUR_WEIGHT = 0.7
+
+
+class ChurnIntervalPlanner:
+    """Choose check intervals from each search's new-listing rate by hour of day.
+
+    Rates come from ``ListingState.first_seen_at`` over the last
+    ``adaptive_history_days``, ignoring the first hour of every preference
+    (its initial crawl marks the whole result list as new). Searches are
+    polled in proportion to the square root of their rate for the current
+    UTC hour around their configured ``check_interval_minutes``; when that
+    plan would need more than ``adaptive_budget_share`` of
+    ``yad2_requests_per_minute``, the budget is split by the same weights
+    instead. Preferences on the same search URL share fetches, so intervals
+    are planned per search.
+    """
+
+    def __init__(self) -> None:
+        self.settings = get_settings()
+        self._intervals: Dict[str, float] = {}
+        self._planned_hour: Optional[int] = None
+        self._planned_at = 0.0
+        self._lock = threading.Lock()
+
+    def interval_for(self, session: Session, preference: SearchPreference) -> float:
+        """Seconds until ``preference`` should be checked again."""
+
+        now = datetime.utcnow()
+        with self._lock:
+            if (
+                self._planned_hour != now.hour
+                or time.monotonic() - self._planned_at >= self.settings.adaptive_replan_seconds
+                or preference.id not in self._intervals
+            ):
+                self._intervals = self._plan(session, now)
+                self._planned_hour = now.hour
+                self._planned_at = time.monotonic()
+            interval = self._intervals.get(preference.id)
+
+        if interval is None:
+            # Planned before this preference existed or became active
+            return self._clamp(preference.check_interval_minutes * 60)
+        return interval
+
+    def hourly_rates(self, session: Session, now: datetime) -> Dict[str, List[float]]:
+        """New listings per hour for each UTC hour of day, keyed by preference id."""
+
+        cutoff = now - timedelta(days=self.settings.adaptive_history_days)
+        started = (
+            select(
+                ListingState.preference_id,
+                func.min(ListingState.first_seen_at).label("started_at"),
+            )
+            .group_by(ListingState.preference_id)
+            .subquery()
+        )
+        hour = func.strftime("%H", ListingState.first_seen_at)
+        rows = session.execute(
+            select(ListingState.preference_id, hour, func.count())
+            .join(started, started.c.preference_id == ListingState.preference_id)
+            .where(
+                ListingState.first_seen_at >= cutoff,
+                ListingState.first_seen_at > func.datetime(started.c.started_at, "+1 hour"),
+            )
+            .group_by(ListingState.preference_id, hour)
+        ).all()
+        observed_since = dict(session.execute(select(started.c.preference_id, started.c.started_at)).all())
+
+        rates: Dict[str, List[float]] = defaultdict(lambda: [0.0] * 24)
+        for preference_id, hour_text, count in rows:
+            started_at = max(observed_since[preference_id], cutoff)
+            # Short histories are treated as a full day so one busy hour does not extrapolate wildly
+            days = max(1.0, (now - started_at).total_seconds() / 86400)
+            rates[preference_id][int(hour_text)] = count / days
+        return dict(rates)
+
+    def _plan(self, session: Session, now: datetime) -> Dict[str, float]:
+        preferences = session.execute(
+            select(
+                SearchPreference.id,
+                SearchPreference.source_url,
+                SearchPreference.max_pages,
+                SearchPreference.check_interval_minutes,
+            ).where(SearchPreference.active.is_(True))
+        ).all()
+        rates = self.hourly_rates(session, now)
+
+        members: Dict[str, List[str]] = defaultdict(list)
+        weights: Dict[str, float] = {}
+        costs: Dict[str, int] = {}
+        configured: Dict[str, float] = {}
+        for preference_id, source_url, max_pages, check_minutes in preferences:
+            hourly = rates.get(preference_id, [0.0] * 24)
+            rate = HOUR_WEIGHT * hourly[now.hour] + (1 - HOUR_WEIGHT) * sum(hourly) / 24
+            # Grouped as FetchCoordinator shares fetches: by canonical search URL
+            search = canonicalize_search_url(source_url)
+            members[search].append(preference_id)
+            weights[search] = max(weights.get(search, 0.0), math.sqrt(rate + PRIOR_RATE_PER_HOUR))
+            # A newest-first crawl usually stops after the first page
+            pages = max(1, min(max_pages or 1, self.settings.max_pages_per_search))
+            costs[search] = max(costs.get(search, 1), 1 if is_sorted_by_date(source_url) else pages)
+            configured[search] = min(configured.get(search, math.inf), check_minutes * 60)
+
+        if not members:
+            return {}
+
+        # Scale each search's configured interval around the mean weight: hot searches
+        # come round sooner, dead ones later, at about the same total request rate
+        mean_weight = sum(weights.values()) / len(weights)
+        search_intervals = {
+            url: self._clamp(configured[url] * mean_weight / weight) for url, weight in weights.items()
+        }
+
+        if self.settings.yad2_requests_per_minute > 0:
+            budget = self.settings.yad2_requests_per_minute * 60 * self.settings.adaptive_budget_share
+            planned = sum(costs[url] * 3600 / interval for url, interval in search_intervals.items())
+            if planned > budget:
+                budgeted = self._spend_budget(budget, weights, costs)
+                search_intervals = {url: max(interval, budgeted[url]) for url, interval in search_intervals.items()}
+
+        intervals: Dict[str, float] = {}
+        for url, preference_ids in members.items():
+            for preference_id in preference_ids:
+                intervals[preference_id] = search_intervals[url]
+        logger.debug(
+            "Planned %d searches for hour %02d: intervals %.0f-%.0fs",
+            len(search_intervals),
+            now.hour,
+            min(search_intervals.values()),
+            max(search_intervals.values()),
+        )
+        return intervals
+
+    def _spend_budget(self, budget: float, weights: Dict[str, float], costs: Dict[str, int]) -> Dict[str, float]:
+        """Split ``budget`` requests/hour by weight; searches capped at the minimum interval give back their share."""
+
+        minimum = self.settings.min_check_interval_seconds
+        intervals: Dict[str, float] = {}
+        remaining = dict(weights)
+        while remaining:
+            total_weight = sum(remaining.values())
+            planned = {
+                url: 3600 * total_weight * costs[url] / (budget * weight) for url, weight in remaining.items()
+            }
+            capped = [url for url, interval in planned.items() if interval < minimum]
+            if not capped:
+                intervals.update({url: self._clamp(interval) for url, interval in planned.items()})
+                break
+            for url in capped:
+                intervals[url] = float(minimum)
+                budget -= costs[url] * 3600 / minimum
+                del remaining[url]
+            if budget <= 0:
+                # Everything left is over budget at the maximum interval anyway; the limiter paces the rest
+                intervals.update({url: float(self.settings.max_check_interval_seconds) for url in remaining})
+                break
+        return intervals
+
+    def _clamp(self, seconds: float) -> float:
+        return float(
+            max(
+                self.settings.min_check_interval_seconds,
+                min(seconds, self.settings.max_check_interval_seconds),
+            )
+        )
@@ -1,19 +1,28 @@
 from __future__ import annotations
 
+import asyncio
+import heapq
+import itertools
 import logging
 import random
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
-from sqlalchemy import select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
+from .. import metrics
 from ..config import get_settings
 from ..db import session_scope
-from ..models import Listing, SearchPreference, User
+from ..models import Listing, ListingPriceHistory, ListingState, SearchPreference, User
+from ..parsers import listing_price_amount
 from ..yad_scrapper import StealthYad2Monitor
+from .fetcher import FetchCoordinator, is_sorted_by_date, page_url
+from .intervals import ChurnIntervalPlanner
 from .telegram import TelegramService
 
 
@@ -22,220 +31,767 @@ logger = logging.getLogger(__name__)
 
 ListingDict = Dict[str, Any]
 
-
-class MonitorWorker(threading.Thread):
-    def __init__(self, preference_id: str, telegram_service: TelegramService) -> None:
-        super().__init__(daemon=True)
+# Catalog columns compared before rewriting a row, so unchanged listings cost no write
+CATALOG_FIELDS = (
+    "title",
+    "price",
+    "price_amount",
+    "location",
+    "details",
+    "link",
+    "price_drop_text",
+    "rooms",
+    "floor",
+    "sqm",
+)
+
+
+def _as_number(value: Any, kind: type) -> Any:
+    if value is None:
+        return None
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def catalog_row(listing: ListingDict, now: datetime) -> Dict[str, Any]:
+    """Map a scraped listing dict to a ``listings`` catalog row."""
+
+    return {
+        "listing_id": listing["id"],
+        "title": listing.get("title") or "",
+        "price": listing.get("price"),
+        "price_amount": listing_price_amount(listing),
+        "location": listing.get("location"),
+        "details": listing.get("details"),
+        "link": listing.get("link"),
+        "price_drop_text": listing.get("price_drop_text") if listing.get("price_dropped") else None,
+        "rooms": _as_number(listing.get("rooms"), float),
+        "floor": _as_number(listing.get("floor"), int),
+        "sqm": _as_number(listing.get("sqm"), int),
+        "first_seen_at": now,
+        "updated_at": now,
+    }
+
+
+def upsert_catalog(session: Session, listings: Iterable[ListingDict], now: datetime) -> None:
+    """Insert new catalog listings and rewrite only the ones whose fields changed.
+
+    Every preference watching a search upserts the same listings, so the
+    conflict branch is guarded by a ``WHERE`` that skips identical rows. A
+    ``listing_price_history`` row is appended whenever a listing first shows
+    up with a price or its price amount changes.
+    """
+
+    rows = [catalog_row(listing, now) for listing in listings]
+    if not rows:
+        return
+
+    known_amounts = dict(
+        session.execute(
+            select(Listing.listing_id, Listing.price_amount).where(
+                Listing.listing_id.in_([row["listing_id"] for row in rows])
+            )
+        ).all()
+    )
+    history = [
+        {
+            "listing_id": row["listing_id"],
+            "price_amount": row["price_amount"],
+            "price": row["price"],
+            "observed_at": now,
+        }
+        for row in rows
+        if row["price_amount"] is not None
+        and (row["listing_id"] not in known_amounts or known_amounts[row["listing_id"]] != row["price_amount"])
+    ]
+
+    stmt = sqlite_insert(Listing)
+    changed = or_(*(getattr(Listing, name).is_distinct_from(getattr(stmt.excluded, name)) for name in CATALOG_FIELDS))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Listing.listing_id],
+        set_={name: getattr(stmt.excluded, name) for name in CATALOG_FIELDS + ("updated_at",)},
+        where=changed,
+    )
+    session.execute(stmt, rows)
+    if history:
+        session.execute(insert(ListingPriceHistory), history)
+
+
+class PreferenceMonitor:
+    """Scrape, diff and notify cycle for one preference, independent of scheduling."""
+
+    def __init__(
+        self,
+        preference_id: str,
+        telegram_service: TelegramService,
+        fetch_coordinator: FetchCoordinator,
+        interval_planner: Optional[ChurnIntervalPlanner] = None,
+    ) -> None:
         self.preference_id = preference_id
         self.telegram_service = telegram_service
-        self.stop_event = threading.Event()
+        self.fetch_coordinator = fetch_coordinator
+        self.interval_planner = interval_planner
         self.settings = get_settings()
         self.monitor: Optional[StealthYad2Monitor] = None
+        self.source_url: Optional[str] = None
+        # Fingerprint of the last page this preference fully diffed
+        self.last_content_hash: Optional[str] = None
+        self.last_full_diff_at = 0.0
+        # Monotonic time the next check is due, set by whoever schedules it
+        self.due_at: Optional[float] = None
+        # Set when the scheduler drops this job; a running cycle closes it on return
+        self.cancelled = False
+
+    def close(self) -> None:
+        self.fetch_coordinator.unsubscribe(self)
+        try:
+            metrics.PREFERENCE_LAG_SECONDS.remove(self.preference_id)
+        except KeyError:
+            pass
+
+    def run_cycle(self) -> Optional[float]:
+        """Run one check and return the seconds to wait before the next one.
+
+        Returns ``None`` when the preference is gone or inactive and should no
+        longer be scheduled.
+        """
+
+        if self.due_at is not None:
+            metrics.PREFERENCE_LAG_SECONDS.labels(self.preference_id).set(max(0.0, time.monotonic() - self.due_at))
+
+        sleep_seconds = self.settings.min_check_interval_seconds
+
+        # # Check quiet hours BEFORE scraping
+        # if self.settings.is_quiet_hours():
+        #     logger.debug("Quiet hours active. Skipping scraping for preference %s", self.preference_id)
+        #     # Sleep for a shorter time during quiet hours to check when they end
+        #     return 1500  # Check every 5 minutes
+
+        with session_scope() as session:
+            preference = session.get(SearchPreference, self.preference_id)
+            if not preference or not preference.active:
+                logger.info("Preference %s inactive. Stopping worker", self.preference_id)
+                return None
+
+            if self.monitor is None or self.source_url != preference.source_url:
+                self.monitor = self.fetch_coordinator.subscribe(self, preference.source_url)
+                self.source_url = preference.source_url
+
+            sleep_seconds = max(
+                self.settings.min_check_interval_seconds,
+                min(
+                    preference.check_interval_minutes * 60,
+                    self.settings.max_check_interval_seconds,
+                ),
+            )
+            if self.interval_planner is not None:
+                sleep_seconds = self.interval_planner.interval_for(session, preference)
+            source_url = preference.source_url
+            max_pages = preference.max_pages
+
+        # Fetch outside any session: the rate limiter can hold a crawl for minutes
+        crawled = self._crawl_pages(source_url, max_pages)
+
+        with session_scope() as session:
+            preference = session.get(SearchPreference, self.preference_id)
+            if not preference or not preference.active:
+                logger.info("Preference %s inactive. Stopping worker", self.preference_id)
+                return None
+            if preference.source_url != source_url:
+                # Edited while fetching; the next cycle crawls the new search
+                crawled = None
+
+            user = preference.user
+            updates_to_send = self._process_preference(session, user, preference, crawled)
+
+            chat_id = user.telegram_chat_id
+            if chat_id and updates_to_send:
+                messages = self._format_messages(preference, updates_to_send)
+                self.telegram_service.notify_listing_updates(chat_id, messages, session=session)
+
+            if chat_id:
+                pending = self._collect_pending_notifications(session, preference.id)
+                if pending:
+                    messages = self._format_messages(preference, pending)
+                    self.telegram_service.notify_listing_updates(chat_id, messages, session=session)
+                    self._mark_pending_as_sent(session, preference.id, pending)
+
+        jitter = random.uniform(-0.25, 0.25)
+        return max(self.settings.min_check_interval_seconds, sleep_seconds + (sleep_seconds * jitter))
+
+    def _format_messages(self, preference: SearchPreference, updates: List[ListingDict]) -> List[str]:
+        """One message per update, or packed digests when the preference asks for them."""
 
-    def stop(self) -> None:
-        self.stop_event.set()
-
-    def run(self) -> None:
-        logger.info("Starting monitor worker for preference %s", self.preference_id)
-        while not self.stop_event.is_set():
-            sleep_seconds = self.settings.min_check_interval_seconds
-
-            # # Check quiet hours BEFORE scraping
-            # if self.settings.is_quiet_hours():
-            #     logger.debug("Quiet hours active. Skipping scraping for preference %s", self.preference_id)
-            #     # Sleep for a shorter time during quiet hours to check when they end
-            #     self.stop_event.wait(1500)  # Check every 5 minutes
-            #     continue
-
-            with session_scope() as session:
-                preference = session.get(SearchPreference, self.preference_id)
-                if not preference or not preference.active:
-                    logger.info("Preference %s inactive. Stopping worker", self.preference_id)
-                    return
-
-                if self.monitor is None or self.monitor.url != preference.source_url:
-                    self.monitor = StealthYad2Monitor(preference.source_url)
-
-                user = preference.user
-                sleep_seconds = max(
-                    self.settings.min_check_interval_seconds,
-                    min(
-                        preference.check_interval_minutes * 60,
-                        self.settings.max_check_interval_seconds,
-                    ),
-                )
-
-                updates_to_send = self._process_preference(session, user, preference)
-
-                chat_id = user.telegram_chat_id
-                if chat_id and updates_to_send:
-                    messages = [self.monitor.format_listing_for_telegram(update) for update in updates_to_send]
-                    self.telegram_service.notify_listing_updates(chat_id, messages)
+        assert self.monitor is not None
+        if preference.digest_enabled and len(updates) > 1:
+            return self.monitor.format_digest_for_telegram(updates)
+        return [self.monitor.format_listing_for_telegram(update) for update in updates]
 
-                if chat_id:
-                    pending = self._collect_pending_notifications(session, user.id)
-                    if pending:
-                        messages = [self.monitor.format_listing_for_telegram(item) for item in pending]
-                        self.telegram_service.notify_listing_updates(chat_id, messages)
-                        self._mark_pending_as_sent(session, user.id, pending)
+    def _process_preference(
+        self,
+        session: Session,
+        user: User,
+        preference: SearchPreference,
+        crawled: Optional[Tuple[List[ListingDict], Optional[str]]],
+    ) -> List[ListingDict]:
+        """Diff the crawled pages unless nothing changed since the last diff."""
 
-            jitter = random.uniform(-0.25, 0.25)
-            wait_seconds = max(self.settings.min_check_interval_seconds, sleep_seconds + (sleep_seconds * jitter))
-            logger.debug("Worker %s sleeping for %.1fs", self.preference_id, wait_seconds)
-            self.stop_event.wait(wait_seconds)
+        assert self.monitor is not None
+        if crawled is None:
+            return []
+        page_listings, content_hash = crawled
+
+        # An identical page cannot produce updates; still re-diff now and then so
+        # last_seen_at keeps moving for listings that stay on the page.
+        if (
+            content_hash is not None
+            and content_hash == self.last_content_hash
+            and time.monotonic() - self.last_full_diff_at < self.settings.unchanged_page_rediff_seconds
+        ):
+            self.fetch_coordinator.stats.incr("diffs_skipped")
+            logger.debug("Page unchanged for preference %s, skipping diff", self.preference_id)
+            return []
+        self.last_content_hash = content_hash
+        self.last_full_diff_at = time.monotonic()
 
-        logger.info("Monitor worker for preference %s stopped", self.preference_id)
+        with metrics.DIFF_DB_SECONDS.time():
+            return self._diff_listings(session, user, preference, page_listings)
 
-    def _process_preference(
+    def _diff_listings(
         self,
         session: Session,
         user: User,
         preference: SearchPreference,
+        page_listings: List[ListingDict],
     ) -> List[ListingDict]:
+        """Diff the current listings against the database in two round trips.
+
+        Known rows are loaded with a single ``IN`` query, every listing is
+        classified in memory, and the result is written back with one
+        ``INSERT ... ON CONFLICT DO UPDATE`` batch.
+        """
+
         assert self.monitor is not None
-        html = self.monitor.fetch_page()
-        if not html:
+
+        # The same card can appear twice on a page (e.g. promoted and organic)
+        listings: Dict[str, ListingDict] = {}
+        for listing in page_listings:
+            listings.setdefault(listing["id"], listing)
+        if not listings:
             return []
 
-        listings = self.monitor.parse_listings(html)
-        updates: List[ListingDict] = []
+        known = {
+            row.listing_id: row
+            for row in session.execute(
+                select(
+                    ListingState.listing_id,
+                    ListingState.price,
+                    ListingState.price_amount,
+                    ListingState.price_hash,
+                    ListingState.price_drop_notified,
+                    ListingState.last_notification_type,
+                    ListingState.last_notified_at,
+                ).where(
+                    ListingState.preference_id == preference.id,
+                    ListingState.listing_id.in_(list(listings)),
+                )
+            )
+        }
 
-        for listing in listings:
-            listing_id = listing["id"]
-            existing: Optional[Listing] = session.execute(
-                select(Listing).where(Listing.user_id == user.id, Listing.listing_id == listing_id)
-            ).scalar_one_or_none()
+        now = datetime.utcnow()
+        notified_at = now if user.telegram_chat_id else None
+        updates: List[ListingDict] = []
+        rows: List[Dict[str, Any]] = []
 
+        for listing_id, listing in listings.items():
             listing_copy = listing.copy()
-            listing_copy.setdefault("timestamp", datetime.utcnow().isoformat())
+            listing_copy.setdefault("timestamp", now.isoformat())
 
             normalized_price = self.monitor.normalize_price_for_comparison(listing.get("price", ""))
             price_hash = self.monitor.compute_price_hash(normalized_price)
-
+            price_amount = listing_price_amount(listing)
+
+            row: Dict[str, Any] = {
+                "preference_id": preference.id,
+                "listing_id": listing_id,
+                "price": listing.get("price"),
+                "price_amount": price_amount,
+                "price_hash": price_hash,
+                "first_seen_at": now,
+                "last_seen_at": now,
+            }
+
+            existing = known.get(listing_id)
             if existing is None:
                 listing_copy["notification_type"] = "new"
                 updates.append(listing_copy)
-                model = Listing(
-                    user_id=user.id,
-                    preference_id=preference.id,
-                    listing_id=listing_id,
-                    raw_payload=listing_copy,
-                    price=listing.get("price"),
-                    price_hash=price_hash,
+                row.update(
+                    previous_price=None,
                     price_drop_notified=False,
                     last_notification_type="new",
-                    last_notified_at=datetime.utcnow() if user.telegram_chat_id else None,
-                    first_seen_at=datetime.utcnow(),
-                    last_seen_at=datetime.utcnow(),
+                    last_notified_at=notified_at,
                 )
-                try:
-                    session.add(model)
-                    session.flush()  # Flush immediately to catch constraint violations
-                except IntegrityError:
-                    # Listing already exists (race condition or previous failed transaction)
-                    logger.warning("Listing %s already exists for user %s, treating as existing", listing_id, user.id)
-                    session.rollback()
-                    # Re-fetch the existing listing and update it
-                    existing = session.execute(
-                        select(Listing).where(Listing.user_id == user.id, Listing.listing_id == listing_id)
-                    ).scalar_one_or_none()
-                    if existing:
-                        existing.last_seen_at = datetime.utcnow()
-                        existing.raw_payload = listing_copy
-                    # Remove from updates since it's not actually new
-                    if updates and updates[-1] == listing_copy:
-                        updates.pop()
-            else:
-                existing.last_seen_at = datetime.utcnow()
-                existing.raw_payload = listing_copy
+                rows.append(row)
+                continue
 
+            if price_amount is not None and existing.price_amount is not None:
+                price_changed = price_amount != existing.price_amount
+            else:
                 previous_price_hash = existing.price_hash
-                current_price_hash = price_hash
-
-                notification_type: Optional[str] = None
-
                 if previous_price_hash is None or previous_price_hash == "":
                     previous_price_hash = self.monitor.compute_price_hash(
                         self.monitor.normalize_price_for_comparison(existing.price or "")
                     )
+                price_changed = price_hash != previous_price_hash
 
-                if current_price_hash != previous_price_hash:
-                    if listing.get("price_dropped"):
-                        notification_type = "price_drop"
-                        listing_copy["notification_type"] = "price_drop"
-                        listing_copy["old_price"] = existing.price
-                    else:
-                        notification_type = "price_change"
-                        listing_copy["notification_type"] = "price_change"
-                        listing_copy["old_price"] = existing.price
-
-                    updates.append(listing_copy)
-
-                    existing.price = listing.get("price")
-                    existing.price_hash = current_price_hash
-                    existing.price_drop_notified = listing.get("price_dropped", False)
-                    existing.last_notification_type = notification_type
-                    existing.last_notified_at = datetime.utcnow() if user.telegram_chat_id else None
-                else:
-                    existing.price = listing.get("price")
-                    existing.price_hash = current_price_hash
+            if price_changed:
+                notification_type = "price_drop" if listing.get("price_dropped") else "price_change"
+                listing_copy["notification_type"] = notification_type
+                listing_copy["old_price"] = existing.price
+                updates.append(listing_copy)
+                row.update(
+                    previous_price=existing.price,
+                    price_drop_notified=listing.get("price_dropped", False),
+                    last_notification_type=notification_type,
+                    last_notified_at=notified_at,
+                )
+            else:
+                row.update(
+                    previous_price=None,
+                    price_drop_notified=existing.price_drop_notified,
+                    last_notification_type=existing.last_notification_type,
+                    last_notified_at=existing.last_notified_at,
+                )
+            rows.append(row)
+
+        upsert_catalog(session, listings.values(), now)
+
+        stmt = sqlite_insert(ListingState)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ListingState.preference_id, ListingState.listing_id],
+            set_={
+                "price": stmt.excluded.price,
+                "price_amount": stmt.excluded.price_amount,
+                "previous_price": func.coalesce(stmt.excluded.previous_price, ListingState.previous_price),
+                "price_hash": stmt.excluded.price_hash,
+                "price_drop_notified": stmt.excluded.price_drop_notified,
+                "last_notification_type": stmt.excluded.last_notification_type,
+                "last_notified_at": stmt.excluded.last_notified_at,
+                "last_seen_at": stmt.excluded.last_seen_at,
+            },
+        )
+        session.execute(stmt, rows)
 
         return updates if user.telegram_chat_id else []
 
-    def _collect_pending_notifications(self, session: Session, user_id: str) -> List[ListingDict]:
+    def _crawl_pages(
+        self,
+        source_url: str,
+        max_pages: Optional[int],
+    ) -> Optional[Tuple[List[ListingDict], Optional[str]]]:
+        """Fetch result pages up to the preference's ``max_pages``.
+
+        For searches sorted newest-first the crawl stops at the first page
+        whose listings are all already known, so a quiet search usually costs
+        a single request. Returns ``None`` when the first page failed, else the
+        listings of every fetched page and a combined content fingerprint.
+        Runs outside the caller's session; the known-page check opens its own.
+        """
+
+        max_pages = max(1, min(max_pages or 1, self.settings.max_pages_per_search))
+        by_date = is_sorted_by_date(source_url)
+        listings: List[ListingDict] = []
+        hashes: List[Optional[str]] = []
+
+        for page in range(1, max_pages + 1):
+            result = self.fetch_coordinator.get_listings(
+                page_url(source_url, page),
+                subscriber=self,
+            )
+            if not result.ok:
+                if page == 1:
+                    return None
+                break
+
+            listings.extend(result.listings)
+            hashes.append(result.content_hash)
+            if page == max_pages or not result.listings:
+                break
+
+            if by_date:
+                page_ids = {listing["id"] for listing in result.listings}
+                with session_scope() as session:
+                    known_count = session.execute(
+                        select(func.count()).select_from(ListingState).where(
+                            ListingState.preference_id == self.preference_id,
+                            ListingState.listing_id.in_(page_ids),
+                        )
+                    ).scalar_one()
+                if known_count >= len(page_ids):
+                    logger.debug("Page %d of preference %s fully known, stopping crawl", page, self.preference_id)
+                    break
+
+        content_hash = None if None in hashes else ":".join(hashes)
+        return listings, content_hash
+
+    def _collect_pending_notifications(self, session: Session, preference_id: str) -> List[ListingDict]:
         rows = session.execute(
-            select(Listing).where(
-                Listing.user_id == user_id,
-                Listing.last_notified_at.is_(None),
-                Listing.last_notification_type.is_not(None),
+            select(ListingState, Listing)
+            .join(Listing, ListingState.listing_id == Listing.listing_id)
+            .where(
+                ListingState.preference_id == preference_id,
+                ListingState.last_notified_at.is_(None),
+                ListingState.last_notification_type.is_not(None),
             )
-        ).scalars().all()
+        ).all()
         pending: List[ListingDict] = []
-        for row in rows:
-            payload = row.raw_payload or {}
-            if payload:
-                pending.append(payload)
+        for state, listing in rows:
+            payload = listing.to_payload()
+            payload["price"] = state.price
+            payload["notification_type"] = state.last_notification_type
+            if state.previous_price is not None and state.last_notification_type != "new":
+                payload["old_price"] = state.previous_price
+            pending.append(payload)
         return pending
 
-    def _mark_pending_as_sent(self, session: Session, user_id: str, payloads: List[ListingDict]) -> None:
+    def _mark_pending_as_sent(self, session: Session, preference_id: str, payloads: List[ListingDict]) -> None:
         if not payloads:
             return
         listing_ids = [item.get("id") for item in payloads if item.get("id")]
         if not listing_ids:
             return
 
-        session.query(Listing).filter(
-            Listing.user_id == user_id,
-            Listing.listing_id.in_(listing_ids),
-        ).update({Listing.last_notified_at: datetime.utcnow()}, synchronize_session=False)
+        session.query(ListingState).filter(
+            ListingState.preference_id == preference_id,
+            ListingState.listing_id.in_(listing_ids),
+        ).update({ListingState.last_notified_at: datetime.utcnow()}, synchronize_session=False)
+
+
+class MonitorWorker(PreferenceMonitor, threading.Thread):
+    """Thread-per-preference runner used by the ``threads`` monitor mode."""
+
+    def __init__(
+        self,
+        preference_id: str,
+        telegram_service: TelegramService,
+        fetch_coordinator: FetchCoordinator,
+        interval_planner: Optional[ChurnIntervalPlanner] = None,
+        initial_delay: float = 0.0,
+    ) -> None:
+        PreferenceMonitor.__init__(self, preference_id, telegram_service, fetch_coordinator, interval_planner)
+        threading.Thread.__init__(self, daemon=True)
+        self.stop_event = threading.Event()
+        self.initial_delay = initial_delay
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def run(self) -> None:
+        logger.info("Starting monitor worker for preference %s", self.preference_id)
+        try:
+            if self.initial_delay > 0:
+                self.due_at = time.monotonic() + self.initial_delay
+                self.stop_event.wait(self.initial_delay)
+            while not self.stop_event.is_set():
+                wait_seconds = self.run_cycle()
+                if wait_seconds is None:
+                    return
+                logger.debug("Worker %s sleeping for %.1fs", self.preference_id, wait_seconds)
+                self.due_at = time.monotonic() + wait_seconds
+                self.stop_event.wait(wait_seconds)
+        finally:
+            self.close()
+
+        logger.info("Monitor worker for preference %s stopped", self.preference_id)
+
+
+class AsyncMonitorScheduler:
+    """Drive every preference from one asyncio loop instead of one thread each.
+
+    Due times live in a heap of ``(due_at, sequence, job)`` entries.
+    The loop sleeps until the earliest entry is due and hands the blocking
+    cycle to a small thread pool, so at most ``max_concurrency`` checks are in
+    flight regardless of how many preferences are scheduled.
+    """
+
+    def __init__(
+        self,
+        telegram_service: TelegramService,
+        fetch_coordinator: FetchCoordinator,
+        max_concurrency: int,
+        interval_planner: Optional[ChurnIntervalPlanner] = None,
+    ) -> None:
+        self.telegram_service = telegram_service
+        self.fetch_coordinator = fetch_coordinator
+        self.interval_planner = interval_planner
+        self.max_concurrency = max(1, max_concurrency)
+        self.jobs: Dict[str, PreferenceMonitor] = {}
+        # Jobs whose cycle is in the executor; they are closed when it returns
+        self._running: Set[PreferenceMonitor] = set()
+        self._heap: List[Tuple[float, int, PreferenceMonitor]] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._ready = threading.Event()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run_loop, name="monitor-scheduler", daemon=True)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="monitor-cycle")
+
+    def start(self) -> None:
+        self._thread.start()
+        self._ready.wait()
+
+    def add(self, preference_id: str, delay_seconds: float = 0.0) -> bool:
+        """Schedule ``preference_id``; returns False if it is already scheduled."""
+
+        with self._lock:
+            if preference_id in self.jobs:
+                return False
+            job = PreferenceMonitor(
+                preference_id,
+                self.telegram_service,
+                self.fetch_coordinator,
+                self.interval_planner,
+            )
+            self.jobs[preference_id] = job
+            self._push(job, delay_seconds)
+        return True
+
+    def remove(self, preference_id: str) -> None:
+        with self._lock:
+            job = self.jobs.pop(preference_id, None)
+            if job is None:
+                return
+            job.cancelled = True
+            if job in self._running:
+                return
+        job.close()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stopping = True
+            jobs = list(self.jobs.values())
+            self.jobs.clear()
+            self._heap.clear()
+            for job in jobs:
+                job.cancelled = True
+        for job in jobs:
+            job.close()
+        self._wake()
+        self._thread.join(timeout=5)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _push(self, job: PreferenceMonitor, delay_seconds: float) -> None:
+        if self._stopping:
+            return
+        job.due_at = time.monotonic() + delay_seconds
+        heapq.heappush(self._heap, (job.due_at, next(self._sequence), job))
+        self._wake()
+
+    def _wake(self) -> None:
+        if self._loop is not None and self._wakeup is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _run_loop(self) -> None:
+        asyncio.run(self._main())
+
+    async def _main(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        running: Set[asyncio.Task] = set()
+        self._ready.set()
+        logger.info("Async monitor scheduler started (max %d concurrent checks)", self.max_concurrency)
+
+        while not self._stopping:
+            with self._lock:
+                due: List[PreferenceMonitor] = []
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    _, _, job = heapq.heappop(self._heap)
+                    # Entries of removed (or removed and re-added) preferences are stale
+                    if not job.cancelled:
+                        due.append(job)
+                        self._running.add(job)
+                timeout = self._heap[0][0] - now if self._heap else None
+
+            for job in due:
+                await semaphore.acquire()
+                task = asyncio.create_task(self._run_job(job, semaphore))
+                running.add(task)
+                task.add_done_callback(running.discard)
+
+            if due:
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        for task in running:
+            task.cancel()
+        logger.info("Async monitor scheduler stopped")
+
+    async def _run_job(self, job: PreferenceMonitor, semaphore: asyncio.Semaphore) -> None:
+        loop = asyncio.get_running_loop()
+        preference_id = job.preference_id
+        try:
+            try:
+                wait_seconds = await loop.run_in_executor(self._executor, job.run_cycle)
+            except Exception:  # noqa: BLE001 - one failing preference must not stop the scheduler
+                logger.exception("Monitor cycle failed for preference %s", preference_id)
+                wait_seconds = float(self.fetch_coordinator.ttl_seconds)
+
+            with self._lock:
+                self._running.discard(job)
+                if not job.cancelled and wait_seconds is not None:
+                    logger.debug("Preference %s due again in %.1fs", preference_id, wait_seconds)
+                    self._push(job, wait_seconds)
+                    return
+                if not job.cancelled:
+                    self.jobs.pop(preference_id, None)
+                    job.cancelled = True
+            # Removed while its cycle ran, or the preference went inactive
+            job.close()
+        finally:
+            semaphore.release()
 
 
 class MonitorManager:
     def __init__(self, telegram_service: TelegramService) -> None:
         self.telegram_service = telegram_service
+        self.settings = get_settings()
+        self.fetch_coordinator = FetchCoordinator()
+        self.interval_planner: Optional[ChurnIntervalPlanner] = None
+        if self.settings.monitor_interval_mode == "adaptive":
+            self.interval_planner = ChurnIntervalPlanner()
         self.workers: Dict[str, MonitorWorker] = {}
         self.lock = threading.Lock()
+        self._sync_stop = threading.Event()
+        self._sync_thread: Optional[threading.Thread] = None
+        self.scheduler: Optional[AsyncMonitorScheduler] = None
+        if self.settings.monitor_mode == "asyncio":
+            self.scheduler = AsyncMonitorScheduler(
+                telegram_service,
+                self.fetch_coordinator,
+                max_concurrency=self.settings.monitor_max_concurrent_checks,
+                interval_planner=self.interval_planner,
+            )
+            self.scheduler.start()
+
+    def active_count(self) -> int:
+        """Number of preferences currently scheduled or running."""
+
+        return len(self.running_ids())
+
+    def start_monitor(self, preference_id: str, initial_delay: float = 0.0) -> None:
+        """Start monitoring ``preference_id``, with its first check ``initial_delay`` seconds from now."""
+
+        if self.scheduler is not None:
+            if not self.scheduler.add(preference_id, initial_delay):
+                logger.info("Monitor for %s already running", preference_id)
+            return
 
-    def start_monitor(self, preference_id: str) -> None:
         with self.lock:
             worker = self.workers.get(preference_id)
             if worker and worker.is_alive():
                 logger.info("Monitor for %s already running", preference_id)
                 return
 
-            worker = MonitorWorker(preference_id, self.telegram_service)
+            worker = MonitorWorker(
+                preference_id,
+                self.telegram_service,
+                self.fetch_coordinator,
+                self.interval_planner,
+                initial_delay=initial_delay,
+            )
             self.workers[preference_id] = worker
             worker.start()
 
+    def start_staggered(self, preferences: Iterable[Tuple[str, int]]) -> int:
+        """Start ``(preference_id, check_interval_minutes)`` pairs spread over their first interval.
+
+        Used after a restart, so thousands of preferences do not all fetch in
+        the same second. Returns the number of monitors started.
+        """
+
+        started = 0
+        for preference_id, check_interval_minutes in preferences:
+            interval = max(
+                self.settings.min_check_interval_seconds,
+                min(check_interval_minutes * 60, self.settings.max_check_interval_seconds),
+            )
+            self.start_monitor(preference_id, initial_delay=random.uniform(0, interval))
+            started += 1
+        return started
+
+    def running_ids(self) -> Set[str]:
+        if self.scheduler is not None:
+            return set(self.scheduler.jobs)
+        with self.lock:
+            return {preference_id for preference_id, worker in self.workers.items() if worker.is_alive()}
+
+    def sync_preferences(self) -> int:
+        """Start every active, Telegram-connected preference that is not monitored yet.
+
+        Picks up preferences registered through ``api``-role processes, which
+        cannot start monitors themselves. Returns the number started.
+        """
+
+        with session_scope() as session:
+            rows = session.execute(
+                select(SearchPreference.id)
+                .join(SearchPreference.user)
+                .where(
+                    SearchPreference.active.is_(True),
+                    User.telegram_chat_id.is_not(None),
+                    User.telegram_chat_id != "",
+                )
+            ).all()
+
+        missing = {preference_id for preference_id, in rows} - self.running_ids()
+        for preference_id in missing:
+            self.start_monitor(preference_id)
+        if missing:
+            logger.info("Started %d preferences registered elsewhere", len(missing))
+        return len(missing)
+
+    def start_sync(self, interval_seconds: float) -> None:
+        """Run :meth:`sync_preferences` every ``interval_seconds`` until :meth:`stop_all`."""
+
+        def run() -> None:
+            while not self._sync_stop.wait(interval_seconds):
+                try:
+                    self.sync_preferences()
+                except Exception:  # noqa: BLE001 - keep syncing after DB hiccups
+                    logger.exception("Preference sync failed")
+
+        self._sync_thread = threading.Thread(target=run, name="preference-sync", daemon=True)
+        self._sync_thread.start()
+
     def stop_monitor(self, preference_id: str) -> None:
+        if self.scheduler is not None:
+            self.scheduler.remove(preference_id)
+            return
+
         with self.lock:
             worker = self.workers.pop(preference_id, None)
             if worker:
                 worker.stop()
 
     def stop_all(self) -> None:
-        with self.lock:
-            for worker in self.workers.values():
-                worker.stop()
-            self.workers.clear()
+        self._sync_stop.set()
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        else:
+            with self.lock:
+                for worker in self.workers.values():
+                    worker.stop()
+                self.workers.clear()
+        self.fetch_coordinator.close()
 
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..parsers import ListingDict, ListingParser, extract_next_data_listings, get_parser, key_by_token
+
+
+logger = logging.getLogger(__name__)
+
+
+# Keys the parsers emit, in the order they are packed into worker results
+LISTING_FIELDS = (
+    "id",
+    "link",
+    "price",
+    "title",
+    "location",
+    "details",
+    "price_dropped",
+    "price_drop_text",
+    "token",
+    "price_value",
+    "rooms",
+    "floor",
+    "sqm",
+    "timestamp",
+)
+
+# A packed listing is (bitmask of present fields, value per field)
+PackedListing = Tuple[Any, ...]
+
+# Parser instances of the current worker process, one per backend
+_worker_parsers: Dict[str, ListingParser] = {}
+
+
+def pack_listings(listings: List[ListingDict]) -> List[PackedListing]:
+    """Turn listing dicts into flat tuples, which pickle far smaller than dicts."""
+
+    packed = []
+    for listing in listings:
+        mask = 0
+        values = []
+        for bit, key in enumerate(LISTING_FIELDS):
+            if key in listing:
+                mask |= 1 << bit
+            values.append(listing.get(key))
+        packed.append((mask, *values))
+    return packed
+
+
+def unpack_listings(packed: List[PackedListing]) -> List[ListingDict]:
+    listings = []
+    for mask, *values in packed:
+        fields = zip(LISTING_FIELDS, values)
+        listings.append({key: value for bit, (key, value) in enumerate(fields) if mask >> bit & 1})
+    return listings
+
+
+def parse_page(html: str, backend: str, extraction_mode: str) -> List[ListingDict]:
+    """What ``StealthYad2Monitor.parse_listings`` does, without the per-search monitor."""
+
+    if extraction_mode == "next_data":
+        listings = extract_next_data_listings(html)
+        if listings is not None:
+            return listings
+
+    parser = _worker_parsers.get(backend)
+    if parser is None:
+        parser = _worker_parsers[backend] = get_parser(backend)
+    listings = parser.parse(html)
+    if extraction_mode == "next_data":
+        # Same ids as the feed, so a page without it does not look all-new
+        listings = key_by_token(listings)
+    return listings
+
+
+def parse_packed(html: str, backend: str, extraction_mode: str) -> List[PackedListing]:
+    """Worker entry point: parse a page and pack the listings for the trip back."""
+
+    return pack_listings(parse_page(html, backend, extraction_mode))
+
+
+class ParsePool:
+    """Parse result pages in worker processes so parsing is not serialized by the GIL.
+
+    Fetch threads hand the raw HTML to :meth:`parse` and block until a worker
+    returns the packed listings. If the pool breaks (a worker was killed), it
+    is rebuilt and the page is parsed in the calling thread instead; the same
+    happens for stragglers after :meth:`stop`.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # Forking a process that already runs threads can copy held locks into the child
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        return ProcessPoolExecutor(max_workers=self.size, mp_context=context)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+        logger.info("Started parse pool with %d worker processes", self.size)
+
+    def parse(self, html: str, backend: str, extraction_mode: str) -> List[ListingDict]:
+        with self._lock:
+            executor = self._executor
+        if executor is None:
+            # Stopped at shutdown while a monitor cycle was still running
+            return parse_page(html, backend, extraction_mode)
+
+        try:
+            packed = executor.submit(parse_packed, html, backend, extraction_mode).result()
+        except BrokenProcessPool:
+            logger.exception("Parse pool broke, restarting it and parsing in-thread")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = self._new_executor()
+            executor.shutdown(wait=False, cancel_futures=True)
+            return parse_page(html, backend, extraction_mode)
+        except RuntimeError:
+            # submit() raced with stop()
+            if self._executor is not None:
+                raise
+            return parse_page(html, backend, extraction_mode)
+        return unpack_listings(packed)
+
+    def stop(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+            logger.info("Parse pool stopped")
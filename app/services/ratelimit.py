@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional
+
+from .. import metrics
+from ..config import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _HostState:
+    tokens: float
+    updated_at: float
+    blocked_until: float = 0.0
+    strikes: int = 0
+
+
+class HostRateLimiter:
+    """Process-wide token bucket per host with shared exponential backoff.
+
+    Every fetch calls :meth:`acquire` first, so the total request rate to a
+    host stays at ``requests_per_minute`` no matter how many preferences are
+    monitored. A 403/429 reported through :meth:`report_throttled` pauses the
+    whole host, doubling the pause on each consecutive strike, instead of
+    parking only the thread that happened to see it.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        burst: int = 1,
+        backoff_base_seconds: float = 60.0,
+        backoff_max_seconds: float = 1800.0,
+    ) -> None:
+        self.rate_per_second = requests_per_minute / 60.0 if requests_per_minute > 0 else 0.0
+        self.burst = max(1, burst)
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host: str, now: float) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = _HostState(tokens=float(self.burst), updated_at=now)
+            self._hosts[host] = state
+        return state
+
+    def acquire(self, host: str) -> float:
+        """Block until a request to ``host`` may be sent; returns the seconds waited."""
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                state = self._state(host, now)
+                if now < state.blocked_until:
+                    delay = state.blocked_until - now
+                elif not self.rate_per_second:
+                    return waited
+                else:
+                    elapsed = now - state.updated_at
+                    state.tokens = min(float(self.burst), state.tokens + elapsed * self.rate_per_second)
+                    state.updated_at = now
+                    if state.tokens >= 1.0:
+                        state.tokens -= 1.0
+                        return waited
+                    delay = (1.0 - state.tokens) / self.rate_per_second
+            time.sleep(delay)
+            waited += delay
+
+    def report_throttled(self, host: str, retry_after: Optional[float] = None) -> float:
+        """Back off every request to ``host`` after a 403/429; returns the pause in seconds."""
+
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(host, now)
+            state.strikes += 1
+            delay = min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** (state.strikes - 1))
+            delay = max(delay * random.uniform(0.8, 1.2), retry_after or 0.0)
+            state.blocked_until = max(state.blocked_until, now + delay)
+            state.tokens = 0.0
+            state.updated_at = now
+            strikes = state.strikes
+
+        metrics.YAD2_THROTTLED.inc()
+        logger.warning("Throttled by %s (strike %d), pausing all requests for %.0fs", host, strikes, delay)
+        return delay
+
+    def report_success(self, host: str) -> None:
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is not None:
+                state.strikes = 0
+
+    def blocked_for(self, host: str) -> float:
+        with self._lock:
+            state = self._hosts.get(host)
+            return max(0.0, state.blocked_until - time.monotonic()) if state else 0.0
+
+
+@lru_cache
+def get_host_limiter() -> HostRateLimiter:
+    settings = get_settings()
+    return HostRateLimiter(
+        requests_per_minute=settings.yad2_requests_per_minute,
+        burst=settings.yad2_request_burst,
+        backoff_base_seconds=settings.yad2_backoff_base_seconds,
+        backoff_max_seconds=settings.yad2_backoff_max_seconds,
+    )
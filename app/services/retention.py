@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, exists, select, text
+
+from ..config import get_settings
+from ..db import engine, session_scope
+from ..models import Listing, ListingPriceHistory, ListingState
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionReport:
+    states_removed: int = 0
+    listings_removed: int = 0
+    history_removed: int = 0
+    bytes_reclaimed: int = 0
+
+
+def _file_bytes() -> int:
+    """Pages currently in use by the database file, in bytes."""
+
+    with engine.connect() as connection:
+        page_size = connection.execute(text("PRAGMA page_size")).scalar_one()
+        page_count = connection.execute(text("PRAGMA page_count")).scalar_one()
+    return page_size * page_count
+
+
+class RetentionJob(threading.Thread):
+    """Periodically delete listings that have not been seen for a while.
+
+    Rows go in batches of ``retention_batch_size``, each batch in its own
+    short transaction, so monitor writes never wait long behind the job.
+    ``listing_states`` rows older than ``retention_days`` (by ``last_seen_at``)
+    go first; catalog listings no preference references any more follow
+    together with their price history. Freed pages are then returned to the
+    filesystem with ``PRAGMA incremental_vacuum``.
+    """
+
+    def __init__(self, interval_seconds: Optional[float] = None) -> None:
+        super().__init__(name="retention", daemon=True)
+        self.settings = get_settings()
+        self.interval_seconds = (
+            self.settings.retention_interval_seconds if interval_seconds is None else interval_seconds
+        )
+        self.last_report: Optional[RetentionReport] = None
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        logger.info("Starting retention job (keeping %d days)", self.settings.retention_days)
+        while not self._stop_event.wait(self.interval_seconds):
+            try:
+                self.run_once()
+            except Exception:  # noqa: BLE001 - keep the job alive across DB hiccups
+                logger.exception("Retention run failed")
+        logger.info("Retention job stopped")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run_once(self) -> RetentionReport:
+        report = RetentionReport()
+        cutoff = datetime.utcnow() - timedelta(days=self.settings.retention_days)
+        size_before = _file_bytes()
+
+        report.states_removed = self._delete_stale_states(cutoff)
+        report.history_removed, report.listings_removed = self._delete_orphaned_listings()
+        if report.states_removed or report.listings_removed:
+            self._incremental_vacuum()
+
+        report.bytes_reclaimed = max(0, size_before - _file_bytes())
+        self.last_report = report
+        logger.info(
+            "Retention removed %d listing states, %d listings and %d price points; reclaimed %d bytes",
+            report.states_removed,
+            report.listings_removed,
+            report.history_removed,
+            report.bytes_reclaimed,
+        )
+        return report
+
+    def _delete_stale_states(self, cutoff: datetime) -> int:
+        removed = 0
+        while not self._stop_event.is_set():
+            batch = (
+                select(ListingState.id)
+                .where(ListingState.last_seen_at < cutoff)
+                .limit(self.settings.retention_batch_size)
+                .scalar_subquery()
+            )
+            with session_scope() as session:
+                deleted = session.execute(delete(ListingState).where(ListingState.id.in_(batch))).rowcount
+            removed += deleted
+            if deleted < self.settings.retention_batch_size:
+                break
+        return removed
+
+    def _delete_orphaned_listings(self) -> tuple[int, int]:
+        """Drop catalog listings without any state, re-checking inside each delete.
+
+        The ``NOT EXISTS`` guard is part of the ``DELETE`` itself, so a listing
+        a monitor re-attached in the meantime is never removed.
+        """
+
+        history_removed = 0
+        listings_removed = 0
+        orphaned = ~exists().where(ListingState.listing_id == Listing.listing_id)
+        while not self._stop_event.is_set():
+            with session_scope() as session:
+                ids = list(
+                    session.execute(
+                        select(Listing.listing_id).where(orphaned).limit(self.settings.retention_batch_size)
+                    ).scalars()
+                )
+                if not ids:
+                    break
+                history_removed += session.execute(
+                    delete(ListingPriceHistory).where(
+                        ListingPriceHistory.listing_id.in_(ids),
+                        ~exists().where(ListingState.listing_id == ListingPriceHistory.listing_id),
+                    )
+                ).rowcount
+                deleted = session.execute(delete(Listing).where(Listing.listing_id.in_(ids), orphaned)).rowcount
+            listings_removed += deleted
+            if len(ids) < self.settings.retention_batch_size:
+                break
+        return history_removed, listings_removed
+
+    def _incremental_vacuum(self) -> None:
+        with engine.connect() as connection:
+            if connection.execute(text("PRAGMA auto_vacuum")).scalar_one() != 2:
+                logger.info("auto_vacuum is not INCREMENTAL; run VACUUM once to enable space reclamation")
+                return
+            pages = int(self.settings.retention_vacuum_pages)
+            free_pages = connection.execute(text("PRAGMA freelist_count")).scalar_one()
+            while free_pages and not self._stop_event.is_set():
+                connection.exec_driver_sql(f"PRAGMA incremental_vacuum({pages})")
+                connection.commit()
+                remaining = connection.execute(text("PRAGMA freelist_count")).scalar_one()
+                if remaining >= free_pages:
+                    break
+                free_pages = remaining
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Set, Tuple
+
+import cloudscraper
+import requests
+
+from .. import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+# Same fingerprint StealthYad2Monitor uses for its private session
+BROWSER = {'browser': 'chrome', 'platform': 'windows', 'desktop': True}
+
+
+def _connection_counts(session: requests.Session) -> Tuple[int, int]:
+    """Connections opened and requests sent so far by ``session``'s urllib3 pools."""
+
+    opened = sent = 0
+    for adapter in session.adapters.values():
+        manager = getattr(adapter, "poolmanager", None)
+        if manager is None:
+            continue
+        for key in list(manager.pools.keys()):
+            pool = manager.pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                sent += pool.num_requests
+    return opened, sent
+
+
+class SessionPool:
+    """Lend warm cloudscraper sessions to fetchers instead of one session per monitor.
+
+    At most ``max_sessions`` sessions exist and each keeps a single pooled
+    connection per host, so the pool also caps the sockets open to Yad2.
+    Returned sessions go to the front of the idle list, which keeps the most
+    recently used (and most likely still connected) session in rotation.
+    Every lease records how many of its requests reused a kept-alive
+    connection versus opening a new one (``yad2_http_connections_total``).
+    """
+
+    def __init__(self, max_sessions: int) -> None:
+        self.max_sessions = max(1, max_sessions)
+        self._idle: List[requests.Session] = []
+        # Sessions currently lent out; in_use_count reads this rather than deriving it from counters
+        self._leased: Set[requests.Session] = set()
+        self._created = 0
+        self._closed = False
+        self._available = threading.Condition()
+
+    def _new_session(self) -> requests.Session:
+        session = cloudscraper.create_scraper(browser=BROWSER)
+        for adapter in session.adapters.values():
+            adapter.init_poolmanager(1, maxsize=1, block=True)
+        metrics.HTTP_SESSIONS_CREATED.inc()
+        return session
+
+    @contextmanager
+    def lease(self) -> Iterator[requests.Session]:
+        """Borrow a session, waiting while all ``max_sessions`` are in use."""
+
+        started = time.perf_counter()
+        create = False
+        with self._available:
+            while not self._idle and self._created >= self.max_sessions and not self._closed:
+                self._available.wait()
+            if self._closed:
+                raise RuntimeError("Session pool is closed")
+            if self._idle:
+                session = self._idle.pop()
+                self._leased.add(session)
+            else:
+                self._created += 1
+                create = True
+        metrics.HTTP_SESSION_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+        if create:
+            try:
+                session = self._new_session()
+            except Exception:
+                with self._available:
+                    self._created -= 1
+                    self._available.notify()
+                raise
+            with self._available:
+                self._leased.add(session)
+
+        opened_before, sent_before = _connection_counts(session)
+        try:
+            yield session
+        finally:
+            opened, sent = _connection_counts(session)
+            opened -= opened_before
+            sent -= sent_before
+            if opened:
+                metrics.HTTP_CONNECTIONS.labels("new").inc(opened)
+            if sent > opened:
+                metrics.HTTP_CONNECTIONS.labels("reused").inc(sent - opened)
+            self._release(session)
+
+    def _release(self, session: requests.Session) -> None:
+        with self._available:
+            self._leased.discard(session)
+            if self._closed:
+                session.close()
+                return
+            self._idle.append(session)
+            self._available.notify()
+
+    def idle_count(self) -> int:
+        with self._available:
+            return len(self._idle)
+
+    def in_use_count(self) -> int:
+        with self._available:
+            return len(self._leased)
+
+    def close(self) -> None:
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._available.notify_all()
+        for session in idle:
+            session.close()
+        logger.info("Closed %d pooled HTTP sessions", len(idle))
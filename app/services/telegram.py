@@ -6,21 +6,25 @@ import io
 import logging
 import threading
 import time
-from typing import Iterable, Optional
-
-import qrcode
-from telegram import Bot, Update
-from telegram.error import TelegramError
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Iterable, Optional
 
+from .. import metrics
 from ..config import get_settings
 from ..db import session_scope
 from ..models import SearchPreference, User
 
+# python-telegram-bot and qrcode (with PIL) are imported on first use so the
+# API can start serving without paying for them
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+    from telegram import Bot, Update
 
-logger = logging.getLogger(__name__)
+    from .delivery import TelegramDeliveryQueue
 
-# Thread-local storage for event loops
-_thread_local = threading.local()
+
+logger = logging.getLogger(__name__)
 
 
 def escape_markdown(text: str) -> str:
@@ -35,44 +39,188 @@ def escape_markdown(text: str) -> str:
     return text
 
 
+async def send_markdown_message(bot: "Bot", chat_id: str | int, text: str) -> None:
+    """Send ``text`` as MarkdownV2, retrying once as plain text if Telegram rejects it.
+
+    ``RetryAfter`` is re-raised untouched so callers can honor flood control.
+    """
+
+    from telegram.error import RetryAfter, TelegramError
+
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        await bot.send_message(
+            chat_id=chat_id,
+            text=text,
+            parse_mode="MarkdownV2",
+            disable_web_page_preview=True,
+            read_timeout=30,
+            write_timeout=30,
+            connect_timeout=30,
+            pool_timeout=30,
+        )
+        outcome = "ok"
+    except RetryAfter:
+        outcome = "retry_after"
+        raise
+    except TelegramError as exc:
+        logger.warning("Markdown send failed, retry without formatting: %s", exc)
+        await bot.send_message(
+            chat_id=chat_id,
+            text=text.replace("\\", ""),
+            disable_web_page_preview=True,
+        )
+        outcome = "plain_fallback"
+    finally:
+        metrics.TELEGRAM_SEND_SECONDS.labels(outcome).observe(time.perf_counter() - started)
+
+
 class TelegramService:
     def __init__(self) -> None:
         self.settings = get_settings()
-        self.bot = Bot(token=self.settings.telegram_bot_token)
+        self._bot: Optional["Bot"] = None
+        self._bot_lock = threading.Lock()
+        self._loop = self._start_loop()
         self.bot_username: Optional[str] = self.settings.telegram_bot_username
         self.update_offset: Optional[int] = None
         self._initialized = False
+        self._bot_info_loaded = False
+        self._bot_info_retry: Optional[Future] = None
         self.on_user_registered = None  # Callback for when user completes registration
+        self.delivery_queue: Optional["TelegramDeliveryQueue"] = None
+        # Set once a webhook is registered; getUpdates is unavailable from then on
+        self.webhook_secret: Optional[str] = None
+        # Rendered QR PNGs by deep link, least recently used first
+        self._qr_cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._qr_lock = threading.Lock()
+
+    @property
+    def bot(self) -> "Bot":
+        """The shared ``Bot``, created (and python-telegram-bot imported) on first use."""
+
+        if self._bot is None:
+            with self._bot_lock:
+                if self._bot is None:
+                    self._bot = self._create_bot()
+        return self._bot
+
+    def _create_bot(self) -> "Bot":
+        from telegram import Bot
+        from telegram.request import HTTPXRequest
+
+        # One pooled client shared by every caller; long polling gets its own
+        # connection so it never starves message sends.
+        self._request = HTTPXRequest(connection_pool_size=self.settings.telegram_connection_pool_size)
+        self._updates_request = HTTPXRequest(connection_pool_size=1)
+        bot_options = {}
+        if self.settings.telegram_api_base_url:
+            bot_options["base_url"] = self.settings.telegram_api_base_url
+        return Bot(
+            token=self.settings.telegram_bot_token,
+            request=self._request,
+            get_updates_request=self._updates_request,
+            **bot_options,
+        )
+
+    def _start_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the event loop thread that owns ``self.bot`` and its connection pool."""
+
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+            loop.close()
+
+        self._loop_thread = threading.Thread(target=run, name="telegram-loop", daemon=True)
+        self._loop_thread.start()
+        ready.wait()
+        return loop
+
+    def submit(self, coro) -> Future:
+        """Schedule ``coro`` on the Telegram loop from any thread."""
 
-    def _get_event_loop(self):
-        """Get or create a persistent event loop for the current thread."""
-        # Check if this thread has a loop
-        if not hasattr(_thread_local, 'loop') or _thread_local.loop is None or _thread_local.loop.is_closed():
-            # Create a new event loop for this thread
-            _thread_local.loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(_thread_local.loop)
-        return _thread_local.loop
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
 
     def _run_async(self, coro):
-        """Run async coroutine safely in current thread."""
-        loop = self._get_event_loop()
-        return loop.run_until_complete(coro)
+        """Run ``coro`` on the Telegram loop and block until it finishes."""
+
+        if threading.current_thread() is self._loop_thread:
+            coro.close()
+            raise RuntimeError("_run_async must not be called from the Telegram loop thread")
+        return self.submit(coro).result()
+
+    def close(self) -> None:
+        """Release the Bot's HTTP connections and stop the Telegram loop."""
+
+        if self._loop.is_closed():
+            return
+
+        async def shutdown() -> None:
+            await asyncio.gather(self._request.shutdown(), self._updates_request.shutdown())
+
+        if self._bot_info_retry is not None:
+            self._bot_info_retry.cancel()
+        if self._bot is not None:
+            try:
+                self.submit(shutdown()).result(timeout=10)
+            except Exception:  # noqa: BLE001 - best effort during shutdown
+                logger.exception("Error while closing Telegram HTTP clients")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join(timeout=5)
+
+    def load_bot_info(self) -> None:
+        """Resolve the bot's username with ``getMe``; done once, at startup."""
+
+        if self._bot_info_loaded:
+            return
+        info = self._run_async(self.bot.get_me())
+        self.bot_username = info.username or self.bot_username
+        self._bot_info_loaded = True
+
+    def retry_bot_info(self, interval_seconds: float = 30.0) -> None:
+        """Keep retrying ``getMe`` on the Telegram loop until it succeeds."""
+
+        async def retry() -> None:
+            from telegram.error import TelegramError
+
+            while not self._bot_info_loaded:
+                await asyncio.sleep(interval_seconds)
+                try:
+                    info = await self.bot.get_me()
+                except TelegramError as exc:
+                    logger.warning("Telegram getMe failed, retrying in %.0fs: %s", interval_seconds, exc)
+                    continue
+                self.bot_username = info.username or self.bot_username
+                self._bot_info_loaded = True
+                logger.info("Resolved Telegram bot username @%s", self.bot_username)
+
+        if self._bot_info_retry is None or self._bot_info_retry.done():
+            self._bot_info_retry = self.submit(retry())
 
     def initialize(self) -> None:
+        from telegram.error import TelegramError
+
         if self._initialized:
             return
 
         try:
-            info = self._run_async(self.bot.get_me())
-            self.bot_username = info.username or self.bot_username
+            self.load_bot_info()
             if self.bot_username is None:
                 raise RuntimeError("Telegram bot username not available. Set TELEGRAM_BOT_USERNAME in env.")
 
-            updates = self._run_async(self.bot.get_updates(timeout=1))
-            if updates:
-                self.update_offset = updates[-1].update_id + 1
-            else:
-                self.update_offset = 0
+            if self.webhook_secret is None:
+                # getUpdates answers 409 Conflict while a webhook from an earlier
+                # start (or a failed switch to webhook mode) is still registered
+                self._run_async(self.bot.delete_webhook())
+                updates = self._run_async(self.bot.get_updates(timeout=1))
+                if updates:
+                    self.update_offset = updates[-1].update_id + 1
+                else:
+                    self.update_offset = 0
 
             self._initialized = True
             logger.info("Telegram bot initialized as @%s", self.bot_username)
@@ -80,14 +228,44 @@ class TelegramService:
             logger.error("Failed to initialize Telegram bot: %s", exc)
             raise
 
-    def generate_deep_link(self, user: User) -> str:
-        self.initialize()
+    def generate_deep_link(self, user: User) -> Optional[str]:
+        """The user's ``/start`` link, or ``None`` while the bot username is unknown.
+
+        Never calls Telegram: the username comes from the startup ``getMe`` (or
+        its background retries) or from ``TELEGRAM_BOT_USERNAME``.
+        """
+
         if not self.bot_username:
-            raise RuntimeError("Telegram bot username missing")
+            return None
         return f"https://t.me/{self.bot_username}?start={user.telegram_start_token}"
     
-    def generate_qr_code(self, deep_link: str) -> str:
-        """Generate QR code for deep link and return as base64 encoded PNG."""
+    def generate_qr_png(self, deep_link: str) -> bytes:
+        """PNG QR code for ``deep_link``, rendered once and then served from an LRU cache.
+
+        Deep links only change with the bot username, so a user's code is
+        rendered on their first registration and reused afterwards.
+        """
+
+        with self._qr_lock:
+            png = self._qr_cache.get(deep_link)
+            if png is not None:
+                self._qr_cache.move_to_end(deep_link)
+                metrics.QR_CACHE_LOOKUPS.labels("hit").inc()
+                return png
+        metrics.QR_CACHE_LOOKUPS.labels("miss").inc()
+
+        png = self._render_qr_png(deep_link)
+        if self.settings.qr_cache_size > 0:
+            with self._qr_lock:
+                self._qr_cache[deep_link] = png
+                while len(self._qr_cache) > self.settings.qr_cache_size:
+                    self._qr_cache.popitem(last=False)
+        return png
+
+    @staticmethod
+    def _render_qr_png(deep_link: str) -> bytes:
+        import qrcode
+
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -99,96 +277,105 @@ class TelegramService:
         
         img = qr.make_image(fill_color="black", back_color="white")
         
-        # Convert to base64
         buffer = io.BytesIO()
         img.save(buffer, format='PNG')
-        buffer.seek(0)
-        img_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        
+        return buffer.getvalue()
+
+    def generate_qr_code(self, deep_link: str) -> str:
+        """Generate QR code for deep link and return as base64 encoded PNG."""
+
+        img_base64 = base64.b64encode(self.generate_qr_png(deep_link)).decode('utf-8')
         return f"data:image/png;base64,{img_base64}"
 
     def send_message(self, chat_id: str | int, text: str) -> None:
+        from telegram.error import TelegramError
+
         try:
-            self._run_async(
-                self.bot.send_message(
-                    chat_id=chat_id,
-                    text=text,
-                    parse_mode="MarkdownV2",
-                    disable_web_page_preview=True,
-                    read_timeout=30,
-                    write_timeout=30,
-                    connect_timeout=30,
-                    pool_timeout=30,
-                )
-            )
+            self._run_async(send_markdown_message(self.bot, chat_id, text))
         except TelegramError as exc:
-            logger.warning("Markdown send failed, retry without formatting: %s", exc)
-            try:
-                self._run_async(
-                    self.bot.send_message(
-                        chat_id=chat_id,
-                        text=text.replace("\\", ""),
-                        disable_web_page_preview=True,
-                    )
-                )
-            except TelegramError as final_exc:
-                logger.error("Failed to send Telegram message: %s", final_exc)
-
-    def notify_listing_updates(self, chat_id: str, messages: Iterable[str]) -> None:
+            logger.error("Failed to send Telegram message: %s", exc)
+
+    def notify_listing_updates(
+        self, chat_id: str, messages: Iterable[str], session: Optional["Session"] = None
+    ) -> None:
+        """Deliver ``messages`` to ``chat_id``.
+
+        When a delivery queue is attached the messages are only enqueued (in
+        ``session``'s transaction when given) and the call returns immediately;
+        otherwise they are sent inline.
+        """
+
+        if self.delivery_queue is not None:
+            self.delivery_queue.enqueue(chat_id, messages, session=session)
+            return
+
         for message in messages:
             self.send_message(chat_id, message)
             time.sleep(1.5)
 
     def poll_for_updates(self) -> None:
+        from telegram.error import TelegramError
+
         self.initialize()
         try:
-            updates: list[Update] = self._run_async(self.bot.get_updates(offset=self.update_offset, timeout=10))
+            updates: list["Update"] = self._run_async(self.bot.get_updates(offset=self.update_offset, timeout=10))
         except TelegramError as exc:
             logger.error("Error polling Telegram updates: %s", exc)
             time.sleep(5)
             return
 
-        if not updates:
-            return
-
         for update in updates:
             self.update_offset = update.update_id + 1
-            message = update.message or update.edited_message
-            if not message:
-                continue
-
-            text = message.text or ""
-            if not text.startswith("/start"):
-                continue
-
-            token = None
-            parts = text.split(maxsplit=1)
-            if len(parts) == 2:
-                token = parts[1].strip()
-
-            if not token:
-                continue
-
-            chat_id = str(message.chat.id)
-            user_id = None
-            with session_scope() as session:
-                user = session.query(User).filter(User.telegram_start_token == token).one_or_none()
-                if not user:
-                    logger.warning("Received /start with unknown token: %s", token)
-                    continue
+            self.handle_update(update)
 
-                user.telegram_chat_id = chat_id
-                session.add(user)
-                user_id = user.id
+    def handle_update(self, update: "Update") -> None:
+        """Process one incoming update; only ``/start <token>`` is acted upon."""
 
-            try:
-                self.send_message(chat_id, "\u2705 Registered successfully. We'll notify you about new listings!")
-            except TelegramError:
-                logger.exception("Failed to confirm Telegram registration for user %s", token)
-            
-            # Start monitoring for all active preferences for this user
-            if self.on_user_registered and user_id:
-                self.on_user_registered(user_id)
+        message = update.message or update.edited_message
+        if not message:
+            return
+
+        text = message.text or ""
+        if not text.startswith("/start"):
+            return
+
+        parts = text.split(maxsplit=1)
+        token = parts[1].strip() if len(parts) == 2 else None
+        if not token:
+            return
+
+        chat_id = str(message.chat.id)
+        with session_scope() as session:
+            user = session.query(User).filter(User.telegram_start_token == token).one_or_none()
+            if not user:
+                logger.warning("Received /start with an unknown token from chat %s", chat_id)
+                return
+
+            user.telegram_chat_id = chat_id
+            session.add(user)
+            user_id = user.id
+
+        try:
+            self.notify_listing_updates(chat_id, ["\u2705 Registered successfully. We'll notify you about new listings!"])
+        except Exception:  # noqa: BLE001 - the chat is linked either way
+            logger.exception("Failed to confirm Telegram registration for user %s (chat %s)", user_id, chat_id)
+
+        # Start monitoring for all active preferences for this user
+        if self.on_user_registered and user_id:
+            self.on_user_registered(user_id)
+
+    def enable_webhook(self, url: str, secret_token: str) -> None:
+        """Register ``url`` as the bot's webhook; raises ``TelegramError`` on failure."""
+
+        self._run_async(
+            self.bot.set_webhook(
+                url=url,
+                secret_token=secret_token,
+                allowed_updates=["message", "edited_message"],
+            )
+        )
+        self.webhook_secret = secret_token
+        logger.info("Telegram webhook registered at %s", url)
 
 
 class TelegramUpdatePoller(threading.Thread):
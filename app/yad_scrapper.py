@@ -1,29 +1,75 @@
 import requests
-from bs4 import BeautifulSoup
 import time
 import json
 import hashlib
 from datetime import datetime
 import logging
-from typing import Any, Dict, List
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
 import os
 import random
 import cloudscraper
+from urllib.parse import urlsplit
+
+from . import metrics
+from .parsers import SoupListingParser, extract_next_data_listings, get_parser, key_by_token
+
+
+# Telegram rejects messages longer than this many UTF-16 code units
+TELEGRAM_MESSAGE_LIMIT = 4096
+DIGEST_FIELD_LIMIT = 200
+
+
+def escape_md(text):
+    """Escape Telegram MarkdownV2 reserved characters."""
+    chars_to_escape = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
+    for char in chars_to_escape:
+        text = text.replace(char, f'\\{char}')
+    return text
+
+
+def telegram_length(text: str) -> int:
+    """Length of ``text`` as Telegram counts it (UTF-16 code units)."""
+    return len(text.encode('utf-16-le')) // 2
 
 
 class StealthYad2Monitor:
-    def __init__(self, url: str, check_interval: int = 900):
+    def __init__(
+        self,
+        url: str,
+        check_interval: int = 900,
+        parser_backend: str = "bs4",
+        extraction_mode: str = "dom",
+        rate_limiter=None,
+        request_jitter_seconds: float = 0.0,
+        session_pool=None,
+    ):
         self.url = url
+        self.host = urlsplit(url).netloc
+        # Shared HostRateLimiter; without one the monitor paces itself with add_randomized_delay
+        self.rate_limiter = rate_limiter
+        self.request_jitter_seconds = request_jitter_seconds
         self.check_interval = check_interval
-
-        # Use cloudscraper instead of requests for better Cloudflare bypass
-        self.session = cloudscraper.create_scraper(
-            browser={
-                'browser': 'chrome',
-                'platform': 'windows',
-                'desktop': True
-            }
-        )
+        self.parser = get_parser(parser_backend)
+        # extract_listing_data takes BeautifulSoup tags whatever the backend
+        self._soup_parser = self.parser if isinstance(self.parser, SoupListingParser) else SoupListingParser()
+        # "next_data" reads the embedded Next.js feed and falls back to the DOM parser
+        self.extraction_mode = extraction_mode
+
+        # Shared SessionPool leasing warm sessions; without one the monitor owns a session
+        self.session_pool = session_pool
+        self.session = None
+        if session_pool is None:
+            # Use cloudscraper instead of requests for better Cloudflare bypass
+            self.session = cloudscraper.create_scraper(
+                browser={
+                    'browser': 'chrome',
+                    'platform': 'windows',
+                    'desktop': True
+                }
+            )
+        # Browser headers sent with every request (sessions may be shared between monitors)
+        self.headers: Dict[str, str] = {}
 
         self.known_listings_file = 'known_listings.json'
 
@@ -59,6 +105,10 @@ class StealthYad2Monitor:
         self.last_request_time = 0
         self.request_count = 0
 
+        # Validators for conditional requests
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+
     def update_headers(self):
         """Update headers with a random user agent and realistic browser headers."""
         user_agent = random.choice(self.user_agents)
@@ -91,7 +141,7 @@ class StealthYad2Monitor:
             headers['sec-ch-ua-mobile'] = '?0'
             headers['sec-ch-ua-platform'] = '"Windows"'
 
-        self.session.headers.update(headers)
+        self.headers.update(headers)
 
     def add_randomized_delay(self):
         """Add randomized delays to mimic human behavior."""
@@ -111,6 +161,26 @@ class StealthYad2Monitor:
         self.logger.info(f"Waiting {base_delay:.1f} seconds before request...")
         time.sleep(base_delay)
 
+    def wait_for_turn(self):
+        """Take a request slot from the shared limiter, or fall back to the per-monitor delay."""
+        if self.rate_limiter is None:
+            self.add_randomized_delay()
+            return
+
+        waited = self.rate_limiter.acquire(self.host)
+        metrics.RATE_LIMIT_WAIT_SECONDS.observe(waited)
+        if self.request_jitter_seconds > 0:
+            time.sleep(random.uniform(0, self.request_jitter_seconds))
+
+    @staticmethod
+    def _retry_after(error: requests.RequestException) -> Optional[float]:
+        response = getattr(error, 'response', None)
+        value = response.headers.get('Retry-After') if response is not None else None
+        try:
+            return float(value) if value else None
+        except ValueError:
+            return None
+
     def load_known_listings(self) -> Dict:
         """Load known listings from JSON file."""
         try:
@@ -135,29 +205,43 @@ class StealthYad2Monitor:
         except Exception as e:
             self.logger.error(f"Error saving known listings: {e}")
 
-    def simulate_human_browsing(self):
+    @contextmanager
+    def http_session(self) -> Iterator[requests.Session]:
+        """The monitor's own session, or one leased from the shared pool for the duration."""
+        if self.session_pool is None:
+            yield self.session
+            return
+        with self.session_pool.lease() as session:
+            yield session
+
+    def simulate_human_browsing(self, session=None):
         """Simulate human browsing patterns before the main request."""
+        session = session or self.session
         # Occasionally visit the homepage first
         if random.random() < 0.2:  # 20% chance
             try:
                 self.logger.info("Simulating homepage visit...")
-                self.session.get('https://www.yad2.co.il/', timeout=30)
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire(urlsplit('https://www.yad2.co.il/').netloc)
+                session.get('https://www.yad2.co.il/', timeout=30, headers=self.headers)
                 time.sleep(random.uniform(1, 3))
             except:
                 pass  # Ignore errors in simulation
 
-    def fetch_page(self) -> str:
-        """Fetch the HTML content of the Yad2 page with stealth measures."""
+    def fetch_page(self, conditional: bool = False) -> Optional[str]:
+        """Fetch the HTML content of the Yad2 page with stealth measures.
+
+        With ``conditional=True`` the validators from the previous successful
+        response are sent along, and ``None`` is returned when the server
+        answers 304 Not Modified. An empty string still means the fetch failed.
+        """
         try:
             # Update headers periodically
             if random.random() < 0.3:  # 30% chance to rotate headers
                 self.update_headers()
 
-            # Add human-like delay
-            self.add_randomized_delay()
-
-            # Simulate human browsing patterns occasionally
-            self.simulate_human_browsing()
+            # Wait for the shared request budget, or add a human-like delay
+            self.wait_for_turn()
 
             # Add referer header to look more natural
             referer_options = [
@@ -165,16 +249,39 @@ class StealthYad2Monitor:
                 'https://www.yad2.co.il/',
                 'https://www.yad2.co.il/realestate/rent'
             ]
-            self.session.headers['Referer'] = random.choice(referer_options)
+            self.headers['Referer'] = random.choice(referer_options)
 
-            # Make the request
-            response = self.session.get(self.url, timeout=30)
+            request_headers = dict(self.headers)
+            if conditional:
+                if self.etag:
+                    request_headers['If-None-Match'] = self.etag
+                if self.last_modified:
+                    request_headers['If-Modified-Since'] = self.last_modified
+
+            with self.http_session() as session:
+                # Simulate human browsing patterns occasionally
+                self.simulate_human_browsing(session)
+
+                # Make the request
+                response = session.get(self.url, timeout=30, headers=request_headers)
             response.raise_for_status()
 
             # Track request
             self.last_request_time = time.time()
             self.request_count += 1
 
+            if response.status_code == 304:
+                self.logger.info("Page not modified since last fetch")
+                if self.rate_limiter is not None:
+                    self.rate_limiter.report_success(self.host)
+                return None
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.report_success(self.host)
+
+            self.etag = response.headers.get('ETag')
+            self.last_modified = response.headers.get('Last-Modified')
+
             self.logger.info(f"Successfully fetched page (Status: {response.status_code})")
             return response.text
 
@@ -182,99 +289,36 @@ class StealthYad2Monitor:
             self.logger.error(f"Error fetching page: {e}")
 
             # If blocked, wait longer before retry
-            if "403" in str(e) or "429" in str(e):
+            status = getattr(getattr(e, 'response', None), 'status_code', None)
+            if status in (403, 429) or "403" in str(e) or "429" in str(e):
                 self.logger.warning("Possible rate limiting detected, waiting longer...")
-                time.sleep(random.uniform(300, 600))  # 5-10 minutes
+                if self.rate_limiter is not None:
+                    # The limiter pauses every fetch to this host; don't hold this thread too
+                    self.rate_limiter.report_throttled(self.host, self._retry_after(e))
+                else:
+                    time.sleep(random.uniform(300, 600))  # 5-10 minutes
 
             return ""
 
     def parse_listings(self, html: str) -> List[Dict]:
-        """Parse listings from the HTML content."""
-        soup = BeautifulSoup(html, 'html.parser')
-        listings = []
-
-        # Yad2 uses item-layout_itemLink__CZZ7w class for listing links
-        listing_items = soup.find_all('a', class_='item-layout_itemLink__CZZ7w')
-
-        self.logger.info(f"Found {len(listing_items)} potential listings")
-
-        for item in listing_items:
-            try:
-                listing_data = self.extract_listing_data(item)
-                if listing_data:
-                    listings.append(listing_data)
-            except Exception as e:
-                self.logger.warning(f"Error parsing listing: {e}")
-
+        """Parse listings from the HTML content using the configured backend."""
+        if self.extraction_mode == "next_data":
+            listings = extract_next_data_listings(html)
+            if listings is not None:
+                self.logger.info(f"Extracted {len(listings)} listings from __NEXT_DATA__")
+                return listings
+            self.logger.warning("No __NEXT_DATA__ feed found, falling back to DOM parsing")
+            listings = key_by_token(self.parser.parse(html))
+            self.logger.info(f"Parsed {len(listings)} listings with {self.parser.name} backend")
+            return listings
+
+        listings = self.parser.parse(html)
+        self.logger.info(f"Parsed {len(listings)} listings with {self.parser.name} backend")
         return listings
 
     def extract_listing_data(self, item) -> Dict:
-        """Extract data from a single listing item."""
-        listing = {}
-
-        # Extract the link first
-        href = item.get('href', '')
-        if href:
-            if href.startswith('/'):
-                full_link = 'https://www.yad2.co.il' + href
-            else:
-                full_link = href
-            # Remove everything after the question mark
-            base_link = full_link.split('?', 1)[0]
-            listing['link'] = base_link
-        else:
-            listing['link'] = 'No link'
-
-        # Check for price drop indicator
-        price_drop_elem = item.find('span', class_='text-tag_textTag__mQeO_ item-image_imageTag__EaPPF')
-        listing['price_dropped'] = price_drop_elem is not None
-        if listing['price_dropped']:
-            listing['price_drop_text'] = price_drop_elem.get_text(strip=True) if price_drop_elem else 'מחיר ירד'
-
-        # Filter out "פרויקט חדש" (new project) listings
-        if listing.get('price_drop_text') == 'פרויקט חדש':
-            return None
-
-        # Find the content container
-        content_div = item.find('div', class_='item-layout_itemContent__qT_A8')
-        if not content_div:
-            return None
-
-        # Extract price
-        price_elem = content_div.find('span', class_='feed-item-price_price__ygoeF')
-        listing['price'] = price_elem.get_text(strip=True) if price_elem else 'No price'
-
-        # Extract title/heading
-        title_elem = content_div.find('span', class_='item-data-content_heading__tphH4')
-        listing['title'] = title_elem.get_text(strip=True) if title_elem else 'No title'
-
-        # Extract location and details
-        info_lines = content_div.find_all('span', class_='item-data-content_itemInfoLine__AeoPP')
-
-        if len(info_lines) >= 1:
-            listing['location'] = info_lines[0].get_text(strip=True)
-        else:
-            listing['location'] = 'No location'
-
-        if len(info_lines) >= 2:
-            listing['details'] = info_lines[1].get_text(strip=True)
-        else:
-            listing['details'] = 'No details'
-
-        # Filter out listings with missing essential data
-        if (listing['price'] == 'No price' or
-                listing['title'] == 'No title' or
-                listing['location'] == 'No location'):
-            return None
-
-        # Create unique ID using title, location, and link
-        listing_text = f"{listing['title']}_{listing['location']}_{listing['link']}"
-        listing['id'] = hashlib.md5(listing_text.encode()).hexdigest()
-
-        # Add timestamp
-        listing['timestamp'] = datetime.now().isoformat()
-
-        return listing
+        """Extract data from a single BeautifulSoup listing item."""
+        return self._soup_parser.extract(item)
 
     def normalize_price_for_comparison(self, price: str) -> str:
         """Normalize price string for accurate comparison, handling shekel symbols and whitespace."""
@@ -407,12 +451,6 @@ class StealthYad2Monitor:
         else:
             header = "🏠 *שינוי מחיר*"
 
-        def escape_md(text):
-            chars_to_escape = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
-            for char in chars_to_escape:
-                text = text.replace(char, f'\\{char}')
-            return text
-
         title = escape_md(listing['title'])
         price = escape_md(listing['price'])
         location = escape_md(listing['location'])
@@ -437,3 +475,54 @@ class StealthYad2Monitor:
 {datetime.now().strftime("%Y %m %d %H:%M:%S")}
 """
         return message
+
+    def format_digest_entry(self, listing: Dict) -> str:
+        """Format one listing as a compact block for a digest message."""
+        notification_type = listing.get('notification_type', 'new')
+        icon = {'new': '🏠', 'price_drop': '💰', 'price_change': '📈'}.get(notification_type, '🏠')
+
+        def field(key, default=''):
+            return escape_md(str(listing.get(key) or default)[:DIGEST_FIELD_LIMIT])
+
+        line = f"{icon} *{field('title')}*\n💰 {field('price')}"
+        if notification_type in ['price_drop', 'price_change'] and listing.get('old_price'):
+            line += f" \\(היה: {field('old_price')}\\)"
+        line += f"\n📍 {field('location')}\n🔗 [View listing]({listing['link']})"
+        return line
+
+    def format_digest_for_telegram(self, listings: List[Dict], max_length: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+        """Pack several listings into as few MarkdownV2 messages as possible.
+
+        Entries are kept in the given order and packed greedily, so the same
+        input always yields the same split. Every message stays within
+        ``max_length`` including its "(i/n)" header.
+        """
+        if not listings:
+            return []
+
+        entries = [self.format_digest_entry(listing) for listing in listings]
+        separator = "\n\n"
+        total = len(listings)
+
+        # Reserve room for the longest possible header before packing
+        def header(index, parts):
+            suffix = f" \\({index}/{parts}\\)" if parts > 1 else ""
+            return f"🔔 *{total} עדכונים חדשים*{suffix}"
+
+        budget = max_length - telegram_length(header(total, total) + separator)
+
+        chunks: List[List[str]] = [[]]
+        used = 0
+        for entry in entries:
+            cost = telegram_length(entry) + (telegram_length(separator) if chunks[-1] else 0)
+            if chunks[-1] and used + cost > budget:
+                chunks.append([])
+                cost = telegram_length(entry)
+                used = 0
+            chunks[-1].append(entry)
+            used += cost
+
+        return [
+            header(index, len(chunks)) + separator + separator.join(chunk)
+            for index, chunk in enumerate(chunks, start=1)
+        ]
@@ -0,0 +1,4 @@
+"""Offline benchmarks for the scrape -> parse -> diff -> notify pipeline.
+
+Run ``python -m benchmarks.run --help``; nothing here talks to Yad2 or Telegram.
+"""
@@ -0,0 +1,137 @@
+"""Results pages for the benchmarks, scaled up from saved Yad2 pages.
+
+The saved pages live in ``tests/fixtures/`` (the parser parity tests use
+them too). :func:`scale_page` repeats a page's feed cards, and the matching
+``__NEXT_DATA__`` feed items, with unique tokens until it holds the wanted
+number of cards, optionally raising prices so monitors see changes. The
+output is deterministic, so every run parses byte-identical input.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.parsers import ITEM_PATH, NEXT_DATA_MARKER, PRICE_CLASS, find_next_data, token_from_link
+
+
+SAVED_PAGE_DIR = Path(__file__).resolve().parent.parent / "tests" / "fixtures"
+# Page the scaled fixtures and the stub Yad2 server are built from (it has both cards and a feed)
+BASE_PAGE = "rent_results"
+DEFAULT_SIZES = (40, 200, 1000)
+
+_CARD = re.compile(r'<li class="feed-list_item.*?</li>', re.S)
+_ITEM_LINK = re.compile(rf'({re.escape(ITEM_PATH)}(?:[^/"?]+/)?)([^/"?]+)')
+_HREF = re.compile(r'href="([^"]*)"')
+_PRICE = re.compile(rf'(class="{PRICE_CLASS}"[^>]*>\s*)(\d[\d,]*)')
+
+
+@lru_cache(maxsize=None)
+def saved_pages() -> Dict[str, str]:
+    """``{name: html}`` of every saved results page."""
+
+    return {path.stem: path.read_text(encoding="utf-8") for path in sorted(SAVED_PAGE_DIR.glob("*_results.html"))}
+
+
+def count_cards(html: str) -> int:
+    return len(_CARD.findall(html))
+
+
+def _card_token(card: str) -> Optional[str]:
+    match = _HREF.search(card)
+    return token_from_link(match.group(1)) if match else None
+
+
+def _scaled_card(card: str, suffix: str, price_offset: int) -> str:
+    card = _ITEM_LINK.sub(lambda match: match.group(1) + match.group(2) + suffix, card)
+    if price_offset:
+        card = _PRICE.sub(
+            lambda match: match.group(1) + f"{int(match.group(2).replace(',', '')) + price_offset:,}", card
+        )
+    return card
+
+
+def scale_page(
+    html: str,
+    count: int,
+    search: int = 0,
+    price_offset: int = 0,
+    next_data: bool = True,
+    start: int = 0,
+    change_every: int = 1,
+) -> str:
+    """``html`` with its feed cards repeated to cards ``start``..``start + count``.
+
+    Card ``i`` is a copy of saved card ``i % n`` whose token gets a
+    ``-s<search>c<i // n>`` suffix. ``price_offset`` is added to every
+    ``change_every``-th card, in the markup and in its feed item alike.
+    """
+
+    cards = _CARD.findall(html)
+    if not cards:
+        raise ValueError("page has no feed cards to scale")
+    head = html[: html.index(cards[0])]
+    tail = html[html.rindex(cards[-1]) + len(cards[-1]) :]
+
+    blob = find_next_data(html)
+    data = json.loads(blob) if blob is not None else None
+    feed: Dict[str, Any] = data["props"]["pageProps"]["feed"] if data is not None else {}
+    # token -> (feed section, item)
+    feed_items = {
+        item["token"]: (section, item)
+        for section, items in feed.items()
+        if isinstance(items, list)
+        for item in items
+        if isinstance(item, dict) and item.get("token")
+    }
+
+    scaled_cards: List[str] = []
+    scaled_feed: Dict[str, List[Dict[str, Any]]] = {
+        section: [] for section, items in feed.items() if isinstance(items, list)
+    }
+    for index in range(start, start + count):
+        card = cards[index % len(cards)]
+        suffix = f"-s{search}c{index // len(cards)}"
+        offset = price_offset if index % change_every == 0 else 0
+        scaled_cards.append(_scaled_card(card, suffix, offset))
+
+        token = _card_token(card)
+        if token in feed_items:
+            section, item = feed_items[token]
+            item = dict(item, token=token + suffix)
+            if offset and isinstance(item.get("price"), (int, float)):
+                item["price"] += offset
+            scaled_feed[section].append(item)
+
+    if data is not None:
+        script_start = tail.index(NEXT_DATA_MARKER)
+        script_end = tail.index("</script>", script_start) + len("</script>")
+        script = ""
+        if next_data:
+            feed.update(scaled_feed)
+            blob = json.dumps(data, ensure_ascii=False)
+            script = f'<script id="__NEXT_DATA__" type="application/json">{blob}</script>'
+        tail = tail[:script_start] + script + tail[script_end:]
+    return head + "".join(scaled_cards) + tail
+
+
+def results_page(count: int, **options: Any) -> str:
+    """A results page of ``count`` cards scaled from the base saved page."""
+
+    return scale_page(saved_pages()[BASE_PAGE], count, **options)
+
+
+def load_fixtures(sizes: Iterable[int] = DEFAULT_SIZES) -> Dict[int, str]:
+    """Return ``{size: html}`` with the base saved page scaled to each size."""
+
+    base = saved_pages()[BASE_PAGE]
+    return {size: scale_page(base, size) for size in sizes}
+
+
+def comparable(listings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Listings without the wall-clock ``timestamp`` so two parses can be compared."""
+
+    return [{key: value for key, value in listing.items() if key != "timestamp"} for listing in listings]
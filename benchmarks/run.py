@@ -0,0 +1,559 @@
+"""Run the offline benchmarks and write the results as JSON.
+
+    python -m benchmarks.run                                 # every suite, small sizes
+    python -m benchmarks.run --suite parse --sizes 40,1000 --parse-pool-sizes 2,4
+    python -m benchmarks.run --suite diff --rows 10000,100000,1000000
+    python -m benchmarks.run --suite e2e --preferences 200 --searches 20
+    python -m benchmarks.run --suite startup --startup-runs 10
+
+Each run uses a throwaway SQLite database, a stub Yad2 server and a fake
+Telegram Bot API server on localhost. Results go to ``benchmarks/results/``
+(or ``--output``) so two runs can be diffed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from .fixtures import BASE_PAGE, DEFAULT_SIZES, comparable, count_cards, load_fixtures, saved_pages
+from .servers import FakeTelegramServer, StubYad2Server
+
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+SUITES = ("parse", "diff", "e2e", "startup")
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+def _time(func: Callable[[], Any], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _disable_stealth_delays() -> None:
+    """The human-like pauses and homepage visits would dominate every timing."""
+
+    from app.yad_scrapper import StealthYad2Monitor
+
+    StealthYad2Monitor.add_randomized_delay = lambda self: None
+    StealthYad2Monitor.simulate_human_browsing = lambda self, session=None: None
+
+
+# --- parse -------------------------------------------------------------------
+
+
+def bench_parse(sizes: List[int], repeat: int) -> Dict[str, Any]:
+    """Listings/sec per parser backend on each saved page and the scaled-up base page, plus a parity check against bs4."""
+
+    from app.parsers import PARSER_BACKENDS, SoupListingParser, extract_next_data_listings, get_parser
+
+    backends = [name for name in PARSER_BACKENDS if get_parser(name).name == name]
+    runs: List[Dict[str, Any]] = []
+    parity: List[Dict[str, Any]] = []
+
+    pages = [(name, count_cards(html), html) for name, html in saved_pages().items()]
+    pages += [(f"{BASE_PAGE}@{size}", size, html) for size, html in load_fixtures(sizes).items()]
+    for page, size, html in pages:
+        reference = comparable(SoupListingParser().parse(html))
+        candidates: Dict[str, Callable[[], List[Dict[str, Any]]]] = {
+            f"dom:{name}": (lambda parser=get_parser(name): parser.parse(html)) for name in backends
+        }
+        candidates["next_data"] = lambda: extract_next_data_listings(html) or []
+
+        for name, parse in candidates.items():
+            listings = parse()
+            if name.startswith("dom:") and name != "dom:bs4":
+                parity.append(
+                    {"page": page, "size": size, "backend": name, "matches_bs4": comparable(listings) == reference}
+                )
+            samples = _time(parse, repeat)
+            runs.append(
+                {
+                    "page": page,
+                    "size": size,
+                    "html_bytes": len(html.encode("utf-8")),
+                    "extractor": name,
+                    "listings": len(listings),
+                    "seconds": _summary(samples),
+                    "listings_per_second": len(listings) / statistics.fmean(samples) if listings else 0.0,
+                }
+            )
+            print(f"parse  {page:<22} {name:<9} {runs[-1]['listings_per_second']:>12,.0f} listings/s")
+
+    return {"runs": runs, "parity": parity}
+
+
+def bench_parse_pool(size: int, pool_sizes: List[int], concurrency: int, jobs: int) -> Dict[str, Any]:
+    """Pages/sec when ``concurrency`` fetch threads parse in-thread versus through a ``ParsePool``."""
+
+    from app.config import get_settings
+    from app.services.parsepool import ParsePool, parse_page
+
+    settings = get_settings()
+    backend, mode = settings.parser_backend, settings.listing_extraction_mode
+    html = load_fixtures([size])[size]
+    reference = comparable(parse_page(html, backend, mode))
+    runs: List[Dict[str, Any]] = []
+    parity: List[Dict[str, Any]] = []
+
+    def run(parse: Callable[[str, str, str], List[Dict[str, Any]]]) -> float:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(lambda _: parse(html, backend, mode), range(jobs)))
+        return jobs / (time.perf_counter() - started)
+
+    for pool_size in [0, *pool_sizes]:
+        pool = None
+        if pool_size:
+            pool = ParsePool(pool_size)
+            pool.start()
+            listings = pool.parse(html, backend, mode)  # warm the workers up before timing
+            parity.append({"pool_size": pool_size, "matches_in_thread": comparable(listings) == reference})
+        try:
+            pages_per_second = run(pool.parse if pool else parse_page)
+        finally:
+            if pool:
+                pool.stop()
+        runs.append({"size": size, "pool_size": pool_size, "jobs": jobs, "pages_per_second": pages_per_second})
+        print(f"parse  size={size:<5} pool={pool_size:<3} {pages_per_second:>10,.1f} pages/s")
+
+    return {"runs": runs, "parity": parity}
+
+
+# --- diff --------------------------------------------------------------------
+
+
+def _seed(start: int, stop: int, preferences: List[str]) -> None:
+    from sqlalchemy import insert
+
+    from app.db import session_scope
+    from app.models import Listing, ListingState
+
+    now = datetime.utcnow()
+    batch = 20_000
+    for offset in range(start, stop, batch):
+        ids = range(offset, min(stop, offset + batch))
+        with session_scope() as session:
+            session.execute(
+                insert(Listing),
+                [
+                    {
+                        "listing_id": f"seed-{n}",
+                        "title": f"רחוב הרצל {n}",
+                        "price": f"{5000 + n % 5000:,} ₪",
+                        "price_amount": 5000 + n % 5000,
+                        "location": "דירה, רמת אביב, תל אביב",
+                        "details": "3 חדרים • קומה 2",
+                        "link": f"https://www.yad2.co.il/realestate/item/seed{n}",
+                        "first_seen_at": now,
+                        "updated_at": now,
+                    }
+                    for n in ids
+                ],
+            )
+            session.execute(
+                insert(ListingState),
+                [
+                    {
+                        "preference_id": preferences[n % len(preferences)],
+                        "listing_id": f"seed-{n}",
+                        "price": f"{5000 + n % 5000:,} ₪",
+                        "price_amount": 5000 + n % 5000,
+                        "price_hash": "",
+                        "price_drop_notified": False,
+                        "last_notification_type": "new",
+                        "last_notified_at": now,
+                        "first_seen_at": now,
+                        "last_seen_at": now,
+                    }
+                    for n in ids
+                ],
+            )
+
+
+def _diff_page(iteration: int, owned: List[int], page_size: int) -> List[Dict[str, Any]]:
+    """A results page: mostly known listings, a few with new prices and a few new ones."""
+
+    rng = random.Random(iteration)
+    known = rng.sample(owned, min(len(owned), page_size * 3 // 4))
+    page = []
+    for position, n in enumerate(known):
+        price = 5000 + n % 5000 + (iteration * 10 if position % 8 == 0 else 0)
+        page.append(
+            {
+                "id": f"seed-{n}",
+                "title": f"רחוב הרצל {n}",
+                "price": f"{price:,} ₪",
+                "location": "דירה, רמת אביב, תל אביב",
+                "details": "3 חדרים • קומה 2",
+                "link": f"https://www.yad2.co.il/realestate/item/seed{n}",
+                "price_dropped": False,
+            }
+        )
+    for k in range(page_size - len(page)):
+        page.append(
+            {
+                "id": f"new-{iteration}-{k}",
+                "title": f"רחוב חדש {k}",
+                "price": f"{6000 + k:,} ₪",
+                "location": "דירה, נווה צדק, תל אביב",
+                "details": "2 חדרים",
+                "link": f"https://www.yad2.co.il/realestate/item/new{iteration}x{k}",
+                "price_dropped": False,
+            }
+        )
+    return page
+
+
+def bench_diff(rows: List[int], iterations: int, page_size: int, preference_count: int) -> Dict[str, Any]:
+    """Diffs/sec of one preference against listing tables of growing size."""
+
+    from app.db import init_db, session_scope
+    from app.models import SearchPreference, User
+    from app.services.monitor import PreferenceMonitor
+    from app.yad_scrapper import StealthYad2Monitor
+
+    init_db()
+    with session_scope() as session:
+        user = User(username="bench-diff", telegram_chat_id="1")
+        session.add(user)
+        session.flush()
+        preferences = [f"bench-pref-{i}" for i in range(preference_count)]
+        session.add_all(SearchPreference(id=pid, user_id=user.id, source_url="http://bench/") for pid in preferences)
+
+    target = preferences[0]
+    monitor = PreferenceMonitor(target, None, None)  # type: ignore[arg-type] - only the diff is exercised
+    monitor.monitor = StealthYad2Monitor("http://bench/")
+
+    runs: List[Dict[str, Any]] = []
+    seeded = 0
+    for total in sorted(rows):
+        _seed(seeded, total, preferences)
+        seeded = total
+        owned = list(range(0, total, preference_count))
+
+        samples = []
+        for iteration in range(iterations):
+            page = _diff_page(len(runs) * iterations + iteration + 1, owned, page_size)
+            started = time.perf_counter()
+            with session_scope() as session:
+                preference = session.get(SearchPreference, target)
+                monitor._diff_listings(session, preference.user, preference, page)
+            samples.append(time.perf_counter() - started)
+
+        runs.append(
+            {
+                "rows": total,
+                "page_size": page_size,
+                "seconds": _summary(samples),
+                "diffs_per_second": len(samples) / sum(samples),
+            }
+        )
+        print(f"diff   rows={total:<8} {runs[-1]['diffs_per_second']:>10,.1f} diffs/s")
+
+    return {"preferences": preference_count, "runs": runs}
+
+
+# --- end to end --------------------------------------------------------------
+
+
+def bench_e2e(
+    preference_count: int,
+    searches: int,
+    rounds: int,
+    concurrency: int,
+    listings_per_page: int,
+    telegram: FakeTelegramServer,
+    yad2: StubYad2Server,
+) -> Dict[str, Any]:
+    """Cycle latency of N preferences through fetch, parse, diff and delivery."""
+
+    from app.config import get_settings
+    from app.db import init_db, session_scope
+    from app.models import SearchPreference, User
+    from app.services.delivery import TelegramDeliveryQueue
+    from app.services.fetcher import FetchCoordinator
+    from app.services.monitor import PreferenceMonitor
+    from app.services.telegram import TelegramService
+
+    init_db()
+    preference_ids = []
+    with session_scope() as session:
+        for i in range(preference_count):
+            user = User(username=f"bench-e2e-{i}", telegram_chat_id=str(100000 + i))
+            preference = SearchPreference(user=user, source_url=yad2.search_url(i % searches), digest_enabled=True)
+            session.add(preference)
+            session.flush()
+            preference_ids.append(preference.id)
+
+    telegram_service = TelegramService()
+    delivery_queue = TelegramDeliveryQueue(telegram_service)
+    telegram_service.delivery_queue = delivery_queue
+    delivery_queue.start()
+    coordinator = FetchCoordinator()
+    monitors = [PreferenceMonitor(pid, telegram_service, coordinator) for pid in preference_ids]
+
+    results: List[Dict[str, Any]] = []
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for round_number in range(rounds):
+                if round_number:
+                    yad2.bump()
+                    # Let the shared fetch cache expire so the new round is fetched
+                    time.sleep(get_settings().fetch_cache_ttl_seconds + 0.1)
+
+                requests_before = yad2.requests
+                messages_before = telegram.messages
+                started = time.perf_counter()
+
+                def timed_cycle(monitor: PreferenceMonitor) -> float:
+                    cycle_started = time.perf_counter()
+                    monitor.run_cycle()
+                    return time.perf_counter() - cycle_started
+
+                latencies = list(pool.map(timed_cycle, monitors))
+                cycles_done = time.perf_counter()
+
+                deadline = cycles_done + 300
+                while delivery_queue.pending_count() and time.perf_counter() < deadline:
+                    time.sleep(0.05)
+                delivered = time.perf_counter()
+
+                results.append(
+                    {
+                        "round": round_number,
+                        "cycle_seconds": _summary(latencies),
+                        "round_wall_seconds": cycles_done - started,
+                        "delivery_drain_seconds": delivered - cycles_done,
+                        "yad2_requests": yad2.requests - requests_before,
+                        "telegram_messages": telegram.messages - messages_before,
+                    }
+                )
+                print(
+                    f"e2e    round={round_number} p50={results[-1]['cycle_seconds']['p50']:.3f}s "
+                    f"p95={results[-1]['cycle_seconds']['p95']:.3f}s "
+                    f"messages={results[-1]['telegram_messages']}"
+                )
+    finally:
+        for monitor in monitors:
+            monitor.close()
+        coordinator.close()
+        delivery_queue.stop()
+        telegram_service.close()
+
+    return {
+        "preferences": preference_count,
+        "searches": searches,
+        "concurrency": concurrency,
+        "listings_per_page": listings_per_page,
+        "rounds": results,
+        "fetch_stats": coordinator.stats.snapshot(),
+        "http_connections": _http_connection_counts(),
+    }
+
+
+def _http_connection_counts() -> Dict[str, float]:
+    from prometheus_client import REGISTRY
+
+    return {
+        kind: REGISTRY.get_sample_value("yad2_http_connections_total", {"kind": kind}) or 0.0
+        for kind in ("new", "reused")
+    }
+
+
+# --- startup -------------------------------------------------------------------
+
+# Modules the API should not need before its first request
+HEAVY_MODULES = ("telegram", "qrcode", "PIL", "cloudscraper", "requests", "bs4", "lxml", "app.services.monitor")
+
+_STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+loaded_at_import = [name for name in {heavy!r} if name in sys.modules]
+from fastapi.testclient import TestClient
+client = TestClient(main.app)
+startup_started = time.perf_counter()
+with client:
+    client.get("/health")
+    ready = time.perf_counter()
+print(json.dumps({{
+    "import_seconds": imported - started,
+    "startup_seconds": ready - startup_started,
+    "loaded_at_import": loaded_at_import,
+    "loaded_after_startup": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+
+def bench_startup(runs: int) -> Dict[str, Any]:
+    """Cold ``import main`` and startup-to-first-/health time per service role, in fresh interpreters."""
+
+    root = Path(__file__).resolve().parent.parent
+    probe = _STARTUP_PROBE.format(heavy=HEAVY_MODULES)
+    roles: Dict[str, Any] = {}
+    for role in ("api", "all"):
+        samples = []
+        for _ in range(runs):
+            env = dict(os.environ, SERVICE_ROLE=role)
+            output = subprocess.run(
+                [sys.executable, "-c", probe], capture_output=True, text=True, check=True, cwd=root, env=env
+            ).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+        roles[role] = {
+            "import_seconds": _summary([sample["import_seconds"] for sample in samples]),
+            "startup_seconds": _summary([sample["startup_seconds"] for sample in samples]),
+            "loaded_at_import": samples[-1]["loaded_at_import"],
+            "loaded_after_startup": samples[-1]["loaded_after_startup"],
+        }
+        print(
+            f"start  role={role:<4} import p50={roles[role]['import_seconds']['p50']:.3f}s "
+            f"startup p50={roles[role]['startup_seconds']['p50']:.3f}s "
+            f"heavy at import={','.join(roles[role]['loaded_at_import']) or '-'}"
+        )
+    return {"runs": runs, "roles": roles}
+
+
+# --- entry point ---------------------------------------------------------------
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", default=",".join(SUITES), help="comma-separated: parse,diff,e2e,startup")
+    parser.add_argument("--sizes", type=_int_list, default=list(DEFAULT_SIZES), help="cards per scaled parse fixture")
+    parser.add_argument("--repeat", type=int, default=5, help="timed repetitions per parse case")
+    parser.add_argument(
+        "--parse-pool-sizes",
+        type=_int_list,
+        default=[os.cpu_count() or 2],
+        help="ParsePool worker counts compared with in-thread parsing by --concurrency threads",
+    )
+    parser.add_argument("--rows", type=_int_list, default=[10_000], help="listing rows for the diff suite")
+    parser.add_argument("--diff-iterations", type=int, default=50)
+    parser.add_argument("--diff-preferences", type=int, default=50, help="preferences the seeded rows are spread over")
+    parser.add_argument("--page-size", type=int, default=40, help="listings per diffed page")
+    parser.add_argument("--preferences", type=int, default=50, help="simulated preferences for e2e")
+    parser.add_argument("--searches", type=int, default=10, help="distinct search URLs shared by the preferences")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--parser-backend", default=None, help="override PARSER_BACKEND for diff/e2e")
+    parser.add_argument("--telegram-latency", type=float, default=0.0, help="seconds the fake Bot API waits per call")
+    parser.add_argument("--startup-runs", type=int, default=5, help="fresh interpreters per role for startup")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    suites = [suite for suite in args.suite.split(",") if suite]
+    unknown = set(suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.WARNING)
+    # StealthYad2Monitor logs every fetch at INFO
+    logging.disable(logging.INFO)
+    workdir = tempfile.TemporaryDirectory(prefix="yad2-bench-")
+
+    with StubYad2Server(listings_per_page=args.page_size) as yad2, FakeTelegramServer(args.telegram_latency) as telegram:
+        # Settings are read once, so everything must be in the environment before app.config loads
+        os.environ["DATA_DIR"] = workdir.name
+        os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:bench")
+        os.environ["TELEGRAM_API_BASE_URL"] = telegram.api_base_url
+        os.environ.setdefault("TELEGRAM_GLOBAL_MESSAGES_PER_SECOND", "1000")
+        os.environ.setdefault("TELEGRAM_PER_CHAT_INTERVAL_SECONDS", "0")
+        os.environ.setdefault("FETCH_CACHE_TTL_SECONDS", "1")
+        os.environ.setdefault("RETENTION_DAYS", "0")
+        os.environ.setdefault("YAD2_REQUESTS_PER_MINUTE", "0")
+        os.environ.setdefault("YAD2_REQUEST_JITTER_SECONDS", "0")
+        if args.parser_backend:
+            os.environ["PARSER_BACKEND"] = args.parser_backend
+        _disable_stealth_delays()
+
+        from app.config import get_settings
+
+        settings = get_settings()
+        report: Dict[str, Any] = {
+            "meta": {
+                "started_at": datetime.utcnow().isoformat() + "Z",
+                "git_commit": _git_commit(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "parser_backend": settings.parser_backend,
+                "extraction_mode": settings.listing_extraction_mode,
+                "sqlite_storage_profile": settings.sqlite_storage_profile,
+                "args": {key: str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+            }
+        }
+
+        if "parse" in suites:
+            report["parse"] = bench_parse(args.sizes, args.repeat)
+            report["parse_pool"] = bench_parse_pool(
+                max(args.sizes), args.parse_pool_sizes, args.concurrency, jobs=args.concurrency * args.repeat * 4
+            )
+        if "diff" in suites:
+            report["diff"] = bench_diff(args.rows, args.diff_iterations, args.page_size, args.diff_preferences)
+        if "startup" in suites:
+            report["startup"] = bench_startup(args.startup_runs)
+        if "e2e" in suites:
+            report["e2e"] = bench_e2e(
+                args.preferences,
+                args.searches,
+                args.rounds,
+                args.concurrency,
+                args.page_size,
+                telegram,
+                yad2,
+            )
+
+    output = args.output or RESULTS_DIR / f"bench-{datetime.utcnow():%Y%m%dT%H%M%SZ}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"wrote {output}")
+
+    workdir.cleanup()
+    parity_failures = [case for case in report.get("parse", {}).get("parity", []) if not case["matches_bs4"]]
+    parity_failures += [case for case in report.get("parse_pool", {}).get("parity", []) if not case["matches_in_thread"]]
+    return 1 if parity_failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""Local stand-ins for Yad2 and the Telegram Bot API."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .fixtures import results_page
+
+
+class _BackgroundServer:
+    """Run a ``ThreadingHTTPServer`` on an ephemeral localhost port."""
+
+    handler_class: type = BaseHTTPRequestHandler
+
+    def __init__(self) -> None:
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.handler_class)
+        self.httpd.daemon_threads = True
+        self.httpd.owner = self  # type: ignore[attr-defined]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name=type(self).__name__, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _Yad2Handler(BaseHTTPRequestHandler):
+    # Keep connections alive like the real site, so session reuse shows up
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:  # noqa: A002 - stdlib signature
+        pass
+
+    def do_GET(self) -> None:
+        server: StubYad2Server = self.server.owner  # type: ignore[attr-defined]
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        try:
+            search = int(parts.path.rstrip("/").rsplit("/", 1)[-1])
+        except ValueError:
+            search = 0
+        page = int(query.get("page", ["1"])[0])
+
+        body, etag = server.page(search, page)
+        server.count_request()
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class StubYad2Server(_BackgroundServer):
+    """Serve ``/search/<n>?page=<p>`` results pages with ETags.
+
+    ``bump()`` starts a new round in which every ``change_every``-th listing
+    has a new price, so the next cycle has real diff work to do.
+    """
+
+    handler_class = _Yad2Handler
+
+    def __init__(self, listings_per_page: int = 40, change_every: int = 10, next_data: bool = True) -> None:
+        super().__init__()
+        self.listings_per_page = listings_per_page
+        self.change_every = change_every
+        self.next_data = next_data
+        self.round = 0
+        self.requests = 0
+        self._cache: Dict[Tuple[int, int, int], Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def search_url(self, search: int) -> str:
+        return f"{self.base_url}/search/{search}"
+
+    def bump(self) -> None:
+        with self._lock:
+            self.round += 1
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def page(self, search: int, page: int) -> Tuple[str, str]:
+        with self._lock:
+            key = (search, page, self.round)
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+            current_round = self.round
+
+        html = results_page(
+            self.listings_per_page,
+            search=search,
+            price_offset=current_round * 100,
+            next_data=self.next_data,
+            start=(page - 1) * self.listings_per_page,
+            change_every=self.change_every,
+        )
+        entry = (html, f'"{search}-{page}-{current_round}"')
+        with self._lock:
+            self._cache[key] = entry
+        return entry
+
+
+class _TelegramHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args) -> None:  # noqa: A002 - stdlib signature
+        pass
+
+    def do_POST(self) -> None:
+        server: FakeTelegramServer = self.server.owner  # type: ignore[attr-defined]
+        method = self.path.rsplit("/", 1)[-1]
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        params = _decode_params(body, self.headers.get("Content-Type", ""))
+
+        if server.latency_seconds:
+            time.sleep(server.latency_seconds)
+
+        if method == "getMe":
+            result: object = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        elif method == "getUpdates":
+            result = []
+        elif method == "sendMessage":
+            result = server.record_message(params)
+        else:
+            result = True
+
+        payload = json.dumps({"ok": True, "result": result}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def _decode_params(body: bytes, content_type: str) -> Dict[str, str]:
+    if not body:
+        return {}
+    if "json" in content_type:
+        return json.loads(body)
+    if "x-www-form-urlencoded" in content_type:
+        return {key: values[0] for key, values in parse_qs(body.decode("utf-8")).items()}
+    # multipart/form-data: good enough for the plain text fields sendMessage uses
+    params: Dict[str, str] = {}
+    for part in body.split(b"--"):
+        header, _, value = part.partition(b"\r\n\r\n")
+        marker = b'name="'
+        if marker in header:
+            name = header.split(marker, 1)[1].split(b'"', 1)[0].decode("utf-8")
+            params[name] = value.rstrip(b"\r\n").decode("utf-8", "replace")
+    return params
+
+
+class FakeTelegramServer(_BackgroundServer):
+    """Accept Bot API calls under ``/bot<token>/<method>`` and count messages."""
+
+    handler_class = _TelegramHandler
+
+    def __init__(self, latency_seconds: float = 0.0) -> None:
+        super().__init__()
+        self.latency_seconds = latency_seconds
+        self.messages = 0
+        self.last_message_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def api_base_url(self) -> str:
+        return f"{self.base_url}/bot"
+
+    def record_message(self, params: Dict[str, str]) -> Dict[str, object]:
+        with self._lock:
+            self.messages += 1
+            self.last_message_at = time.perf_counter()
+            message_id = self.messages
+        chat_id = params.get("chat_id", "0")
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id) if str(chat_id).lstrip("-").isdigit() else 0, "type": "private"},
+            "text": params.get("text", ""),
+        }
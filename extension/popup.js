@@ -122,7 +122,12 @@ function showResult(data) {
 
   resultCard.classList.remove("hidden");
   resultMessage.textContent = data.message || "Registration completed!";
-  telegramLink.href = data.telegram_deep_link;
+  if (data.telegram_deep_link) {
+    telegramLink.href = data.telegram_deep_link;
+    telegramLink.classList.remove("hidden");
+  } else {
+    telegramLink.classList.add("hidden");
+  }
   
   // Display QR code if available
   if (data.telegram_qr_code) {
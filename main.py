@@ -1,16 +1,26 @@
 from __future__ import annotations
 
 import logging
+from typing import TYPE_CHECKING
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy import select
 
+from app import metrics
 from app.api import router as api_router
+from app.config import get_settings
 from app.db import init_db
 from app.db import session_scope
 from app.models import SearchPreference, User
-from app.services.monitor import MonitorManager
-from app.services.telegram import TelegramService, TelegramUpdatePoller
+
+if TYPE_CHECKING:
+    from app.services.delivery import TelegramDeliveryQueue
+    from app.services.monitor import MonitorManager
+    from app.services.parsepool import ParsePool
+    from app.services.retention import RetentionJob
+    from app.services.telegram import TelegramService, TelegramUpdatePoller
 
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
@@ -34,10 +44,83 @@ app.include_router(api_router, prefix="/api")
 
 @app.on_event("startup")
 def on_startup() -> None:
+    # Service modules are imported here rather than at module level: the "api"
+    # role never loads the scraper stack (cloudscraper, parsers, requests)
+    from app.services.delivery import TelegramDeliveryQueue
+    from app.services.telegram import TelegramService
+
+    settings = get_settings()
+    if settings.telegram_update_mode == "webhook" and not settings.telegram_webhook_secret:
+        # Every process must verify the same secret Telegram was given
+        raise RuntimeError("TELEGRAM_WEBHOOK_SECRET must be set when TELEGRAM_UPDATE_MODE=webhook")
     init_db()
 
     telegram_service = TelegramService()
+    delivery_queue = TelegramDeliveryQueue(telegram_service)
+    telegram_service.delivery_queue = delivery_queue
+    metrics.TELEGRAM_QUEUE_DEPTH.set_function(delivery_queue.pending_count)
+
+    app.state.telegram_service = telegram_service
+    app.state.delivery_queue = delivery_queue
+    app.state.monitor_manager = None
+    app.state.telegram_poller = None
+    app.state.parse_pool = None
+    app.state.retention_job = None
+
+    # Resolve the bot username now so registrations build deep links without calling Telegram
+    try:
+        telegram_service.load_bot_info()
+    except Exception:  # noqa: BLE001 - TELEGRAM_BOT_USERNAME still works meanwhile
+        logging.exception("Failed to load Telegram bot info at startup, retrying in the background")
+        telegram_service.retry_bot_info()
+
+    if settings.service_role == "api":
+        # Outbound messages are only enqueued; the monitoring process sends them
+        # and starts new preferences on its next sync
+        _enable_webhook(telegram_service)
+        logging.info("Running in api role: monitoring, Telegram delivery and retention are disabled")
+        return
+
+    delivery_queue.start()
+    _start_monitoring(telegram_service)
+
+
+def _registers_webhook() -> bool:
+    """Whether this process owns the webhook: exactly one service role calls setWebhook."""
+
+    settings = get_settings()
+    return settings.telegram_update_mode == "webhook" and settings.service_role == settings.telegram_webhook_role
+
+
+def _enable_webhook(telegram_service: TelegramService) -> None:
+    settings = get_settings()
+    if not _registers_webhook() or not settings.telegram_webhook_url:
+        return
+
+    from telegram.error import TelegramError
+
+    try:
+        telegram_service.enable_webhook(
+            settings.telegram_webhook_url,
+            settings.telegram_webhook_secret,
+        )
+    except TelegramError:
+        logging.exception("Failed to register Telegram webhook")
+
+
+def _start_monitoring(telegram_service: TelegramService) -> None:
+    from app.services.monitor import MonitorManager
+    from app.services.parsepool import ParsePool
+    from app.services.retention import RetentionJob
+    from app.services.telegram import TelegramUpdatePoller
+
+    settings = get_settings()
     monitor_manager = MonitorManager(telegram_service)
+    metrics.register_fetch_stats(monitor_manager.fetch_coordinator.stats)
+    metrics.MONITOR_WORKERS.set_function(monitor_manager.active_count)
+    session_pool = monitor_manager.fetch_coordinator.session_pool
+    if session_pool is not None:
+        metrics.HTTP_SESSIONS_IN_USE.set_function(session_pool.in_use_count)
     
     # Callback to start monitoring when user completes Telegram registration
     def start_user_monitoring(user_id: str):
@@ -51,23 +134,47 @@ def on_startup() -> None:
             monitor_manager.start_monitor(pref_id)
             logging.info(f"Started monitoring preference {pref_id} for user {user_id}")
     
-    poller = TelegramUpdatePoller(telegram_service, interval_seconds=5, on_user_registered=start_user_monitoring)
-    poller.start()
+    if settings.parse_pool_size > 0:
+        parse_pool = ParsePool(settings.parse_pool_size)
+        parse_pool.start()
+        monitor_manager.fetch_coordinator.parse_pool = parse_pool
+        app.state.parse_pool = parse_pool
+
+    telegram_service.on_user_registered = start_user_monitoring
+    _enable_webhook(telegram_service)
+    if settings.telegram_update_mode == "webhook" and not _registers_webhook():
+        # Polling would delete the other process's webhook
+        logging.info("Telegram updates are received by the %s service role", settings.telegram_webhook_role)
+    elif telegram_service.webhook_secret is None:
+        if settings.telegram_update_mode == "webhook":
+            logging.warning("Telegram webhook not active, falling back to polling")
+        poller = TelegramUpdatePoller(telegram_service, interval_seconds=5, on_user_registered=start_user_monitoring)
+        poller.start()
+        app.state.telegram_poller = poller
 
-    app.state.telegram_service = telegram_service
     app.state.monitor_manager = monitor_manager
-    app.state.telegram_poller = poller
+
+    if settings.retention_days > 0:
+        retention_job = RetentionJob()
+        retention_job.start()
+        app.state.retention_job = retention_job
 
     # Start monitoring for users who have already connected their Telegram
     with session_scope() as session:
-        active_preferences = session.query(SearchPreference).filter(SearchPreference.active.is_(True)).all()
-
-    for pref in active_preferences:
-        # Only start if user has telegram_chat_id (has completed registration)
-        with session_scope() as session:
-            user = session.query(User).filter(User.id == pref.user_id).first()
-            if user and user.telegram_chat_id:
-                monitor_manager.start_monitor(pref.id)
+        startup_preferences = session.execute(
+            select(SearchPreference.id, SearchPreference.check_interval_minutes)
+            .join(SearchPreference.user)
+            .where(
+                SearchPreference.active.is_(True),
+                User.telegram_chat_id.is_not(None),
+                User.telegram_chat_id != "",
+            )
+        ).all()
+
+    started = monitor_manager.start_staggered(startup_preferences)
+    logging.info("Scheduled %d preferences across their first check interval", started)
+    if settings.monitor_sync_seconds > 0:
+        monitor_manager.start_sync(settings.monitor_sync_seconds)
 
 
 @app.on_event("shutdown")
@@ -76,12 +183,33 @@ def on_shutdown() -> None:
     if poller:
         poller.stop()
 
+    retention_job: RetentionJob | None = getattr(app.state, "retention_job", None)
+    if retention_job:
+        retention_job.stop()
+
     monitor_manager: MonitorManager | None = getattr(app.state, "monitor_manager", None)
     if monitor_manager:
         monitor_manager.stop_all()
 
+    parse_pool: ParsePool | None = getattr(app.state, "parse_pool", None)
+    if parse_pool:
+        parse_pool.stop()
+
+    delivery_queue: TelegramDeliveryQueue | None = getattr(app.state, "delivery_queue", None)
+    if delivery_queue:
+        delivery_queue.stop()
+
+    telegram_service: TelegramService | None = getattr(app.state, "telegram_service", None)
+    if telegram_service:
+        telegram_service.close()
+
 
 @app.get("/health")
 def healthcheck() -> dict[str, str]:
     return {"status": "ok"}
 
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint() -> Response:
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
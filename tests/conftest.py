@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# Settings are read on first import of app.config; keep the suite off the real data dir
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:test")
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="yad2-tests-"))
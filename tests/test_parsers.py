@@ -0,0 +1,99 @@
+from pathlib import Path
+
+import pytest
+
+from app.parsers import (
+    PARSER_BACKENDS,
+    SoupListingParser,
+    extract_next_data_listings,
+    get_parser,
+    listing_price_amount,
+    token_from_link,
+)
+from app.services.parsepool import parse_page
+
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+PAGES = sorted(FIXTURE_DIR.glob("*_results.html"))
+
+
+def _read(page: Path) -> str:
+    return page.read_text(encoding="utf-8")
+
+
+def _comparable(listings):
+    return [{key: value for key, value in listing.items() if key != "timestamp"} for listing in listings]
+
+
+@pytest.mark.parametrize("backend", sorted(set(PARSER_BACKENDS) - {SoupListingParser.name}))
+@pytest.mark.parametrize("page", PAGES, ids=lambda page: page.stem)
+def test_backend_matches_bs4(backend, page):
+    if backend == "lxml":
+        pytest.importorskip("lxml")
+    html = _read(page)
+
+    expected = _comparable(SoupListingParser().parse(html))
+    assert expected
+    assert _comparable(get_parser(backend).parse(html)) == expected
+
+
+def test_rent_page_skips_projects_and_incomplete_cards():
+    listings = SoupListingParser().parse(_read(FIXTURE_DIR / "rent_results.html"))
+
+    links = [listing["link"].rsplit("/", 1)[-1] for listing in listings]
+    assert links == ["k3m9x2qa", "p0r7ce51", "zz81bq0m", "a4tt0w9d", "w5ee1u8p"]
+    dropped = listings[1]
+    assert dropped["price_dropped"] is True
+    assert dropped["price_drop_text"] == "מחיר ירד"
+    assert listings[0]["link"] == "https://www.yad2.co.il/realestate/item/tel-aviv-area/k3m9x2qa"
+
+
+@pytest.mark.parametrize("backend", sorted(PARSER_BACKENDS))
+def test_empty_page(backend):
+    if backend == "lxml":
+        pytest.importorskip("lxml")
+    assert get_parser(backend).parse("<html><body><ul></ul></body></html>") == []
+
+
+def _by_token(listings):
+    return {token_from_link(listing["link"]): listing for listing in listings}
+
+
+def test_next_data_matches_html_on_rent_page():
+    html = _read(FIXTURE_DIR / "rent_results.html")
+    from_feed = _by_token(extract_next_data_listings(html))
+    from_html = _by_token(SoupListingParser().parse(html))
+
+    # The feed skips items without a numeric price; the card shows "לא צוין מחיר"
+    assert set(from_html) - set(from_feed) == {"a4tt0w9d"}
+    assert listing_price_amount(from_html["a4tt0w9d"]) is None
+    assert set(from_feed) == {"k3m9x2qa", "p0r7ce51", "zz81bq0m", "w5ee1u8p"}
+    for token, listing in from_feed.items():
+        assert listing["id"] == token
+        assert listing_price_amount(listing) == listing_price_amount(from_html[token])
+        assert listing["price_dropped"] == from_html[token]["price_dropped"]
+
+
+def test_next_data_falls_back_to_html_without_feed():
+    html = _read(FIXTURE_DIR / "forsale_results.html")
+    assert extract_next_data_listings(html) is None
+
+    listings = parse_page(html, "bs4", "next_data")
+    expected = SoupListingParser().parse(html)
+    assert [listing["link"] for listing in listings] == [listing["link"] for listing in expected]
+    # Keyed by token like the feed, so switching sources does not look like new listings;
+    # the card without a link keeps its content hash
+    assert [listing["id"] for listing in listings[:4]] == ["h1fa9c7e", "q8nd3v2s", "t6yb0m3c", "j9kk4d1f"]
+    assert listings[4]["link"] == "No link"
+    assert listings[4]["id"] == expected[4]["id"]
+
+
+def test_next_data_falls_back_to_html_on_malformed_json():
+    html = _read(FIXTURE_DIR / "rent_results.html").replace('"feed":{"private":[{', '"feed":{"private":[{,', 1)
+    assert extract_next_data_listings(html) is None
+
+    listings = parse_page(html, "bs4", "next_data")
+    assert [listing["id"] for listing in listings] == ["k3m9x2qa", "p0r7ce51", "zz81bq0m", "a4tt0w9d", "w5ee1u8p"]
+    assert [listing["price"] for listing in listings] == [
+        listing["price"] for listing in SoupListingParser().parse(_read(FIXTURE_DIR / "rent_results.html"))
+    ]
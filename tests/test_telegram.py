@@ -0,0 +1,49 @@
+import pytest
+from telegram.error import TelegramError
+
+from app.services.telegram import TelegramService
+
+
+class FakeBot:
+    """Records Bot API calls; ``set_webhook`` fails like an unreachable webhook URL."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def get_me(self):
+        self.calls.append("getMe")
+        return type("User", (), {"username": "test_bot"})()
+
+    async def set_webhook(self, **kwargs):
+        self.calls.append("setWebhook")
+        raise TelegramError("Bad webhook: failed to resolve host")
+
+    async def delete_webhook(self, **kwargs):
+        self.calls.append("deleteWebhook")
+        return True
+
+    async def get_updates(self, **kwargs):
+        self.calls.append("getUpdates")
+        return []
+
+
+@pytest.fixture
+def service():
+    service = TelegramService()
+    service._bot = FakeBot()
+    yield service
+    service._bot = None
+    service.close()
+
+
+def test_polling_fallback_deletes_webhook_before_get_updates(service):
+    with pytest.raises(TelegramError):
+        service.enable_webhook("https://example.invalid/api/v1/telegram/webhook", "secret")
+    assert service.webhook_secret is None
+
+    service.initialize()
+
+    calls = service.bot.calls
+    assert "deleteWebhook" in calls
+    assert calls.index("deleteWebhook") < calls.index("getUpdates")
+    assert service.update_offset == 0